@@ -0,0 +1,115 @@
+# Benchmark for osu/request's message_format rendering.
+# Compares finding and replacing every key on each message against rendering the precompiled format.
+#
+# Run from the repository root: python benchmarks/request_format.py
+
+import importlib.util
+import os
+import sys
+import tempfile
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# keep logs out of the repository
+os.chdir(tempfile.mkdtemp())
+
+import irc.bot  # imported by the bot before any module is loaded
+
+from src.definitions import Author
+
+spec = importlib.util.spec_from_file_location(
+    "osu/request", os.path.join(ROOT, "modules", "osu", "request.py")
+)
+request = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(request)
+
+ITERATIONS = 100_000
+"""Amount of messages to format per measurement."""
+
+FORMATS = [
+    request.Module.default_config["message_format"],
+    "%map%",
+    "%requester% requested %song% [%mapstatus%] %mods% | %length% %bpm%BPM %stars%* "
+    + "CS%cs% AR%ar% OD%od% HP%hp% %combo%x by %creatorname%",
+]
+"""Message formats to measure: the default, a single key, and one using many keys."""
+
+MAP = {
+    "id": 129891,
+    "beatmapset_id": 39804,
+    "status": "ranked",
+    "user_id": 2,
+    "creator": "peppy",
+    "total_length": 262,
+    "bpm": 200,
+    "max_combo": 2385,
+    "difficulty_rating": 7.42,
+    "cs": 4,
+    "accuracy": 9,
+    "ar": 9.6,
+    "drain": 6,
+    "mode": "osu",
+    "version": "Marathon",
+    "beatmapset": {
+        "artist": "xi",
+        "artist_unicode": "xi",
+        "title": "FREEDOM DiVE",
+        "title_unicode": "FREEDOM DiVE",
+        "creator": "Nakagawa-Kanon",
+    },
+    "sender": Author("viewer", "Viewer", 1),
+    "mods": "+HDDT",
+}
+"""A map as returned from the osu! API, with the fields requests add."""
+
+
+class Formatter:
+    """Just enough of `request.Module` to compile and render `message_format`."""
+
+    def __init__(self, message_format: str):
+        self.message_format = message_format
+        request.Module.compile_message_format(self)
+
+    def cfg_get(self, key: str):
+        return self.message_format
+
+    def log_e(self, msg: str):
+        pass
+
+
+def replace_format(message: str, map: dict) -> str:
+    """Rendering as it was before precompiling: find every key, then replace each one."""
+    for flag, option in request.MESSAGE_OPT_RE.findall(message):
+        if option not in request.MESSAGE_OPTIONS:
+            continue
+
+        message = message.replace(flag, str(request.MESSAGE_OPTIONS[option](map)))
+
+    return message
+
+
+def main():
+    print(f"{'keys':>5} {'findall+replace':>16} {'precompiled':>12}")
+    for message_format in FORMATS:
+        formatter = Formatter(message_format)
+        assert replace_format(message_format, MAP) == request.Module.format_message(
+            formatter, MAP
+        )
+
+        replaced = timeit.timeit(
+            lambda: replace_format(message_format, MAP), number=ITERATIONS
+        )
+        compiled = timeit.timeit(
+            lambda: request.Module.format_message(formatter, MAP), number=ITERATIONS
+        )
+
+        keys = len(request.MESSAGE_OPT_RE.findall(message_format))
+        print(
+            f"{keys:>5} {replaced / ITERATIONS * 1e6:>14.2f}us {compiled / ITERATIONS * 1e6:>10.2f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# Benchmark for the xp module's grant tick.
+# Compares the original tick (two statements per chatter) against the current batched tick,
+# with and without grant history, on a fresh database with every chatter already tracked.
+#
+# Run from the repository root: python benchmarks/xp_tick.py
+
+import importlib.util
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# keep userdata and logs out of the repository
+os.chdir(tempfile.mkdtemp())
+
+CHATTER_COUNTS = [10_000, 50_000, 100_000]
+"""Amounts of chatters to time a tick for."""
+
+
+class Bot:
+    """Just enough of `TwitchBot` for the xp module to run a tick."""
+
+    channel_id = 0
+    user_id = 0
+    channel_name = "benchmark"
+
+    def __init__(self, users: list):
+        self.presence_handler = self
+        self.users = frozenset(users)
+
+    def snapshot(self) -> frozenset:
+        return self.users
+
+    def send_message(self, msg: str):
+        pass
+
+
+def legacy_tick(db_path: str, users: list, omit_users: list, active_users: list):
+    """The tick as it was before batching: one INSERT OR IGNORE and one UPDATE per chatter."""
+    thread_db = sqlite3.connect(db_path)
+
+    for user in users:
+        user = user.lower()
+        if user in omit_users:
+            continue
+
+        if user in active_users:
+            amt = random.randint(2, 3)
+        else:
+            amt = random.randint(1, 1)
+
+        thread_db.execute("INSERT OR IGNORE INTO xp VALUES(?,?)", (user, 0))
+        thread_db.execute(f'UPDATE xp SET amt = amt + {amt} WHERE user = "{user}"')
+
+    thread_db.commit()
+    thread_db.close()
+
+
+def time_legacy(users: list) -> float:
+    db_path = f"legacy_{len(users)}.db"
+    db = sqlite3.connect(db_path)
+    db.execute("CREATE TABLE IF NOT EXISTS xp (user, amt, UNIQUE(user))")
+    db.close()
+
+    # first tick adds every chatter; time the second
+    legacy_tick(db_path, users, [], [])
+    start = time.perf_counter()
+    legacy_tick(db_path, users, [], [])
+    return time.perf_counter() - start
+
+
+def time_current(users: list, history: bool) -> float:
+    spec = importlib.util.spec_from_file_location(
+        "xp", os.path.join(ROOT, "modules", "xp.py")
+    )
+    xp = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(xp)
+
+    Bot.channel_id = f"{len(users)}_{history}"
+    module = xp.Module(Bot(users), "xp")
+    module.cfg_set("xp_history", history)
+    module.start()
+
+    try:
+        # first tick adds every chatter; time the second
+        module.tick()
+        start = time.perf_counter()
+        module.tick()
+        return time.perf_counter() - start
+
+    finally:
+        module.__del__()
+        module.join()
+
+
+def main():
+    print(f"{'chatters':>10} {'legacy':>10} {'current':>10} {'no history':>12}")
+    for count in CHATTER_COUNTS:
+        users = [f"user{i}" for i in range(count)]
+        legacy = time_legacy(users)
+        current = time_current(users, True)
+        no_history = time_current(users, False)
+        print(
+            f"{count:>10} {legacy * 1000:>8.0f}ms {current * 1000:>8.0f}ms {no_history * 1000:>10.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
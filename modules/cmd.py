@@ -16,7 +16,7 @@ VALID_COMMAND_RE = re.compile(r"[a-z0-9_]+")
 
 
 class Module(BaseModule):
-    helpmsg = "Add, modify, or delete a command. Usage: cmd <add/del> <name> <args?>"
+    helpmsg = "Add, modify, or delete a command, or manage aliases. Usage: cmd <add/del> <name> <args?> / cmd alias <add/del> <alias> <name?>"
 
     default_config = {
         # The parameters to be given, after cooldown, before response
@@ -131,6 +131,49 @@ class Module(BaseModule):
 
             return f"Command {cmd_name} removed successfully."
 
+        if action in ["alias"]:
+            # the acting command name is the alias action here
+            alias_action = cmd_name
+
+            if not cmd:
+                return "Not enough parameters given."
+
+            alias = cmd.pop(0).lower()
+
+            if alias_action in ["+", "a", "add", "create", "new", "make", "mk"]:
+                if not cmd:
+                    return "Please provide the command to alias."
+
+                cmd_name = cmd[0].lower()
+
+                if not VALID_COMMAND_RE.match(alias):
+                    return "Command name can only use alphanumeric characters and underscores (_)."
+
+                if cmd_name not in self._bot.commands_handler.commands:
+                    return f"Command {cmd_name} does not exist!"
+
+                if (
+                    alias in self._bot.commands_handler.commands
+                    and alias not in self._bot.commands_handler.aliases
+                ):
+                    return f"Command {alias} already exists!"
+
+                self._bot.commands_handler.add_alias(alias, cmd_name)
+                self._bot.save()
+
+                return f"Alias {alias} added for {self._bot.commands_handler.aliases[alias]}."
+
+            if alias_action in ["-", "d", "delete", "del", "remove", "rem", "rm"]:
+                if alias not in self._bot.commands_handler.aliases:
+                    return f"Alias {alias} does not exist!"
+
+                self._bot.commands_handler.remove_alias(alias)
+                self._bot.save()
+
+                return f"Alias {alias} removed successfully."
+
+            return "Valid alias actions are: add, remove."
+
         if action in ["e", "modify", "mod", "edit"]:
             if cmd_name not in self._bot.commands_handler.commands:
                 return f"Command {cmd_name} does not exist!"
@@ -159,10 +202,13 @@ class Module(BaseModule):
                 if not VALID_COMMAND_RE.match(new_name):
                     return "Command name can only use alphanumeric characters and underscores (_)."
 
-                self._bot.commands_handler.add(
-                    new_name, self._bot.commands_handler.commands[cmd_name]
-                )
-                self._bot.commands_handler.delete(cmd_name)
+                if (
+                    new_name in self._bot.commands_handler.commands
+                    and new_name not in self._bot.commands_handler.aliases
+                ):
+                    return f"Command {new_name} already exists!"
+
+                self._bot.commands_handler.rename(cmd_name, new_name)
                 self._bot.save()
 
                 return f"Command {cmd_name} renamed to {new_name}."
@@ -223,4 +269,4 @@ class Module(BaseModule):
                 "Valid fields to modify are: cooldown, response, requires_mod, hidden"
             )
 
-        return "Valid actions are: add, remove, edit."
+        return "Valid actions are: add, remove, edit, alias."
@@ -2,37 +2,89 @@
 # Please do not modify this unless you really know what you're doing.
 
 from src.plugins import BaseModule
-from src.definitions import Author, Message
+from src.definitions import Message, status_from_user_privilege
+
+HELP_PAGE_LENGTH = 400
+"""Maximum length of the command listing on one page of help,
+leaving room for the rest of the response within Twitch's 500 character limit."""
 
 
 class Module(BaseModule):
-    helpmsg = "Prints all available commands, or, if provided a module, prints the help message for that module. Usage: help <module?>"
+    helpmsg = "Prints all available commands, or, if provided a module, prints the help message for that module. Usage: help <page?/module?>"
 
     consumes = 1
 
+    def __init__(self, bot, name):
+        BaseModule.__init__(self, bot, name)
+
+        self.pages = []
+        self._pages_key = None
+
+    def get_pages(self) -> list:
+        """Return the command listing split into pages, rebuilding it only if the commands changed since last time."""
+        handler = self._bot.commands_handler
+        key = (id(handler), handler.version)
+        if key != self._pages_key:
+            self.pages = self.build_pages()
+            self._pages_key = key
+
+        return self.pages
+
+    def build_pages(self) -> list:
+        """Build the listing of commands not hidden from help, grouped by privilege,
+        split into pages of at most `HELP_PAGE_LENGTH` characters.
+        """
+        aliases = self._bot.commands_handler.aliases
+
+        groups = dict()
+        for name, command in sorted(self._bot.commands_handler.commands.items()):
+            if not command.hidden and name not in aliases:
+                groups.setdefault(command.privilege, []).append(name)
+
+        pages = []
+        page = ""
+        for priv in sorted(groups):
+            label = f"{status_from_user_privilege(priv)}: "
+            started = False
+
+            for name in groups[priv]:
+                if started:
+                    piece = f", {name}"
+                else:
+                    piece = f"{' | ' if page else ''}{label}{name}"
+
+                # continue on a new page, repeating the group label
+                if page and len(page) + len(piece) > HELP_PAGE_LENGTH:
+                    pages.append(page)
+                    page = ""
+                    piece = f"{label}{name}"
+
+                page += piece
+                started = True
+
+        if page:
+            pages.append(page)
+
+        return pages
+
     def main(self, message: Message):
         args = self.get_args_lower(message)
 
-        # If no command is provided, just run the base help message.
-        if not args:
-            # list of all commands (not hidden, not mod-only)
-            user_commands_list = ", ".join(
-                [
-                    n
-                    for n, c in self._bot.commands_handler.commands.items()
-                    if not c.hidden and not c.privilege > Author.Privilege.VIP
-                ]
-            )
-            # list of all commands (not hidden, mod-only)
-            mod_commands_list = ", ".join(
-                [
-                    n
-                    for n, c in self._bot.commands_handler.commands.items()
-                    if not c.hidden and c.privilege > Author.Privilege.VIP
-                ]
-            )
-
-            return f"Available commands are: {user_commands_list} (mod-only: {mod_commands_list})"
+        # If no command or a page number is provided, list the commands.
+        if not args or args[0].isdigit():
+            pages = self.get_pages()
+            if not pages:
+                return "There are no available commands."
+
+            page = int(args[0]) if args else 1
+            if not 1 <= page <= len(pages):
+                return f"Please provide a page number between 1 and {len(pages)}."
+
+            if len(pages) == 1:
+                return f"Available commands are: {pages[0]}"
+
+            more = f" (help {page + 1} for more)" if page < len(pages) else ""
+            return f"Available commands ({page}/{len(pages)}): {pages[page - 1]}{more}"
 
         # If a command is provided, run the help for it.
         else:
@@ -63,6 +63,16 @@ class OsuAPIv2Helper(src.authentication.OAuth2Handler):
         """
         return self._get(f"/beatmaps/{beatmap_id}")
 
+    def get_beatmaps(self, beatmap_ids: list) -> dict:
+        """
+        https://osu.ppy.sh/docs/index.html#get-beatmaps
+
+        Get information for up to 50 beatmaps with IDs in `beatmap_ids` in one call.
+        """
+        return self._get(
+            f"/beatmaps?{'&'.join([f'ids[]={id}' for id in beatmap_ids[:50]])}"
+        )
+
     def get_beatmapset(self, beatmapset_id: int) -> dict:
         """
         https://osu.ppy.sh/docs/index.html#get-apiv2beatmapsetsbeatmapset
@@ -0,0 +1,128 @@
+from collections import OrderedDict
+import json
+import sqlite3
+import threading
+import time
+
+STATUS_TTL = {
+    "ranked": None,
+    "approved": None,
+    "loved": None,
+    "qualified": 60 * 60,
+    "pending": 10 * 60,
+    "wip": 10 * 60,
+    "graveyard": 24 * 60 * 60,
+}
+"""Seconds to keep cached beatmap information for, by ranked status. `None` never expires."""
+
+DEFAULT_TTL = 10 * 60
+"""Seconds to keep cached beatmap information for when its status is unknown."""
+
+
+class BeatmapCache:
+    """Two-tier cache of osu! API beatmap and beatmapset information.
+
+    Recently used entries are kept in an in-memory LRU, backed by an SQLite store that survives restarts.
+    Entries expire according to their ranked status, so ranked and loved maps are only ever fetched once.
+    """
+
+    def __init__(self, path: str, capacity: int = 512):
+        """Create a new `BeatmapCache`.
+
+        :param path: The path to the SQLite store.
+        :param capacity: The maximum amount of entries to keep in memory.
+        """
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        for table in ["beatmaps", "beatmapsets"]:
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, data TEXT, expires REAL)"
+            )
+        self._db.commit()
+
+    def close(self):
+        """Close the SQLite store."""
+        with self._lock:
+            self._db.close()
+
+    def get_beatmap(self, beatmap_id: int) -> dict | None:
+        """Return cached information for the beatmap with ID `beatmap_id`, or `None` if missing or expired."""
+        return self._get("beatmaps", int(beatmap_id))
+
+    def get_beatmapset(self, beatmapset_id: int) -> dict | None:
+        """Return cached information for the beatmap set with ID `beatmapset_id`, or `None` if missing or expired."""
+        return self._get("beatmapsets", int(beatmapset_id))
+
+    def put_beatmap(self, beatmap: dict):
+        """Cache `beatmap` as returned from the osu! API."""
+        self.put_beatmaps([beatmap])
+
+    def put_beatmaps(self, beatmaps: list):
+        """Cache every beatmap in `beatmaps` as returned from the osu! API, in one transaction."""
+        self._put("beatmaps", beatmaps)
+
+    def put_beatmapset(self, beatmapset: dict):
+        """Cache `beatmapset` as returned from the osu! API."""
+        self._put("beatmapsets", [beatmapset])
+
+    def _get(self, table: str, id: int) -> dict | None:
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get((table, id), None)
+            if entry:
+                self._memory.move_to_end((table, id))
+
+            else:
+                row = self._db.execute(
+                    f"SELECT data, expires FROM {table} WHERE id = ?", (id,)
+                ).fetchone()
+                if not row:
+                    return None
+
+                entry = row
+                self._remember((table, id), entry)
+
+        data, expires = entry
+        if expires is not None and expires < now:
+            return None
+
+        # decode on every hit so callers are free to modify what they get
+        return json.loads(data)
+
+    def _put(self, table: str, items: list):
+        now = time.time()
+
+        rows = []
+        for item in items:
+            # never cache error responses
+            if not item or "id" not in item:
+                continue
+
+            ttl = STATUS_TTL.get(str(item.get("status", "")).lower(), DEFAULT_TTL)
+            rows.append(
+                (item["id"], json.dumps(item), None if ttl is None else now + ttl)
+            )
+
+        if not rows:
+            return
+
+        with self._lock:
+            with self._db:
+                self._db.executemany(
+                    f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?)", rows
+                )
+
+            for id, data, expires in rows:
+                self._remember((table, id), (data, expires))
+
+    def _remember(self, key: tuple, entry: tuple):
+        """Put `entry` in the in-memory LRU, evicting the least recently used entry if full."""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
@@ -0,0 +1,197 @@
+from collections import OrderedDict
+import json
+import os
+import threading
+import time
+
+
+class RequestQueue:
+    """Queue of requested beatmaps, indexed by beatmap ID for O(1) duplicate detection.
+
+    Entries expire `expiry` seconds after being requested, as nothing marks a request as played.
+    Changes are appended to a JSONL journal as they happen, which is replayed on startup
+    and compacted once it grows well past the size of the queue.
+    """
+
+    COMPACT_FACTOR = 4
+    """Compact the journal once it has this many times more lines than the queue has entries."""
+
+    def __init__(
+        self, path: str, max_size: int = 0, per_user: int = 0, expiry: float = 1800
+    ):
+        """Create a new `RequestQueue`, restoring any queue saved at `path`.
+
+        :param path: The path to the journal file.
+        :param max_size: The most entries the queue can hold. 0 for no limit.
+        :param per_user: The most entries one user can have in the queue. 0 for no limit.
+        :param expiry: Seconds after being requested to drop an entry. 0 to keep entries until removed.
+        """
+        self.path = path
+        self.max_size = max_size
+        self.per_user = per_user
+        self.expiry = expiry
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._user_counts = dict()
+        self._journal_lines = 0
+
+        self._replay()
+        self._journal = open(self.path, "a", encoding="utf-8")
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire()
+            return len(self._entries)
+
+    def close(self):
+        """Close the journal file."""
+        with self._lock:
+            self._journal.close()
+
+    def add(self, entry: dict) -> str | None:
+        """Add `entry` to the end of the queue.
+
+        `entry` must have at least the beatmap `id`, requester `uid`, and request `time`.
+
+        :return: The reason the entry was refused, or `None` if it was added.
+        """
+        with self._lock:
+            self._expire()
+
+            if entry["id"] in self._entries:
+                return "That map is already in the queue."
+
+            if self.max_size and len(self._entries) >= self.max_size:
+                return "The request queue is full."
+
+            if self.per_user and self._user_counts.get(entry["uid"], 0) >= self.per_user:
+                return f"You already have {self.per_user} requests in the queue."
+
+            self._add(entry)
+            self._write({"op": "add", "entry": entry})
+            return None
+
+    def remove(self, id: int) -> dict | None:
+        """Remove the entry for beatmap `id`.
+
+        :return: The removed entry, or `None` if it was not queued.
+        """
+        with self._lock:
+            entry = self._remove(id)
+            if entry:
+                self._write({"op": "remove", "id": id})
+            return entry
+
+    def skip(self, position: int = 1) -> dict | None:
+        """Remove the entry at 1-based `position`.
+
+        :return: The removed entry, or `None` if there is no such position.
+        """
+        with self._lock:
+            self._expire()
+
+            if position < 1 or position > len(self._entries):
+                return None
+
+            for i, id in enumerate(self._entries):
+                if i == position - 1:
+                    break
+
+            entry = self._remove(id)
+            self._write({"op": "remove", "id": id})
+            return entry
+
+    def clear(self) -> int:
+        """Remove every entry.
+
+        :return: The amount of entries removed.
+        """
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._user_counts.clear()
+            self._write({"op": "clear"})
+            return count
+
+    def list(self, limit: int = None) -> list:
+        """Return the first `limit` entries, or all of them, in order."""
+        with self._lock:
+            self._expire()
+
+            entries = iter(self._entries.values())
+            if limit is None:
+                return list(entries)
+            return [entry for _, entry in zip(range(limit), entries)]
+
+    def _expire(self):
+        """Remove entries requested more than `self.expiry` seconds ago."""
+        if not self.expiry:
+            return
+
+        # entries are in request order, so only the front can have expired
+        cutoff = time.time() - self.expiry
+        while self._entries:
+            id, entry = next(iter(self._entries.items()))
+            if entry.get("time", 0) >= cutoff:
+                break
+
+            self._remove(id)
+            self._write({"op": "remove", "id": id})
+
+    def _add(self, entry: dict):
+        self._entries[entry["id"]] = entry
+        self._user_counts[entry["uid"]] = self._user_counts.get(entry["uid"], 0) + 1
+
+    def _remove(self, id: int) -> dict | None:
+        entry = self._entries.pop(id, None)
+        if entry:
+            self._user_counts[entry["uid"]] -= 1
+            if not self._user_counts[entry["uid"]]:
+                del self._user_counts[entry["uid"]]
+        return entry
+
+    def _write(self, op: dict):
+        """Append `op` to the journal, compacting it if it has grown too long."""
+        self._journal.write(json.dumps(op) + "\n")
+        self._journal.flush()
+        self._journal_lines += 1
+
+        if self._journal_lines > self.COMPACT_FACTOR * (len(self._entries) + 25):
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the journal as one `add` per current entry, replacing it atomically."""
+        self._journal.close()
+
+        with open(f"{self.path}.tmp", "w", encoding="utf-8") as file:
+            for entry in self._entries.values():
+                file.write(json.dumps({"op": "add", "entry": entry}) + "\n")
+        os.replace(f"{self.path}.tmp", self.path)
+
+        self._journal = open(self.path, "a", encoding="utf-8")
+        self._journal_lines = len(self._entries)
+
+    def _replay(self):
+        """Rebuild the queue from the journal at `self.path`, if there is one."""
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    op = json.loads(line)
+                except json.JSONDecodeError:
+                    # a write cut off by a crash; everything before it is still good
+                    continue
+
+                if op["op"] == "add":
+                    if op["entry"]["id"] not in self._entries:
+                        self._add(op["entry"])
+                elif op["op"] == "remove":
+                    self._remove(op["id"])
+                elif op["op"] == "clear":
+                    self._entries.clear()
+                    self._user_counts.clear()
+
+                self._journal_lines += 1
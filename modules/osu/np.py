@@ -3,23 +3,181 @@
 # Replace the path in the config file in `userdata/[id]/modules/osu` with the path to the file
 #   (default value is default path for Windows StreamCompanion, might not need to change it)
 # Create a command using cmd with %osu/np% as the response.
+#
+# Alternatively, set "source" to "websocket" to read the pattern straight from StreamCompanion's
+# live data stream (the "Web socket data provider" plugin) instead of a file on disk.
+#
+# The file is watched in the background and only re-read when it changes, so `np` is a memory read.
+# Other modules can be told about song changes with `subscribe`, e.g.:
+#   self._bot.modules_handler.get("osu/np").subscribe(lambda np: ...)
 
 # TODO: refactor this to use new osu! APIv2 "Now Playing" once it drops
 # will remove dependency on using StreamCompanion
 
+import json
+import os
+import threading
+import traceback
+
+import websocket
+
 from src.plugins import BaseModule
 
 
 class Module(BaseModule):
     helpmsg = 'Prints "Now Playing" information from a configured file. Usage: np'
 
-    default_config = {"path": "C:/Program Files (x86)/StreamCompanion/Files/np.txt"}
-    """Path to osu!StreamCompanion NP info file."""
+    default_config = {
+        # Where to get now playing information from: "file" or "websocket".
+        "source": "file",
+        # Path to osu!StreamCompanion NP info file.
+        "path": "C:/Program Files (x86)/StreamCompanion/Files/np.txt",
+        # URL of osu!StreamCompanion's output patterns live data stream, and the name of the pattern to use.
+        "websocket_url": "ws://localhost:20727/outputPatterns",
+        "websocket_pattern": "np",
+        # Seconds between checks of the file for changes.
+        "poll_interval": 0.5,
+        # Whether to announce song changes in chat.
+        "announce_changes": False,
+    }
+
+    RECONNECT_MIN_WAIT = 1
+    """Seconds to wait before the first reconnect attempt to the live data stream."""
+    RECONNECT_MAX_WAIT = 30
+    """Most seconds to wait between reconnect attempts to the live data stream."""
+
+    def __init__(self, bot, name):
+        BaseModule.__init__(self, bot, name)
+
+        self.now_playing = None
+        self.subscribers = []
+        self._stopped = threading.Event()
+        self._last_stat = None
+        self._ws = None
+
+        # the current song at startup isn't a change, so only the watcher announces
+        if self.cfg_get("source") == "file":
+            self._last_stat, self.now_playing = self.read_file()
+
+    def __del__(self):
+        self._stopped.set()
+
+        # unblock the live data stream if waiting on it
+        if self._ws:
+            self._ws.close()
+
+    def subscribe(self, callback):
+        """Call `callback` with the new now playing information whenever it changes.
+
+        :param callback: A function taking the now playing `str`, or `None` if there is none.
+        """
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Stop calling `callback` on changes."""
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def run(self):
+        """Watch the configured source until `__del__` is called."""
+        if self.cfg_get("source") == "websocket":
+            self.listen()
+            return
+
+        while not self._stopped.wait(self.cfg_get("poll_interval")):
+            try:
+                self.check_file()
+            except Exception:
+                self.log_e(traceback.format_exc())
+
+    def listen(self):
+        """Keep the latest pattern from the live data stream, reconnecting with backoff when it drops."""
+        url = self.cfg_get("websocket_url")
+        pattern = self.cfg_get("websocket_pattern")
+        wait = self.RECONNECT_MIN_WAIT
+
+        while not self._stopped.is_set():
+            try:
+                self._ws = websocket.create_connection(url)
+                self.log_i(f"connected to live data stream at {url}")
+                wait = self.RECONNECT_MIN_WAIT
+
+                while not self._stopped.is_set():
+                    data = json.loads(self._ws.recv())
+                    if pattern in data:
+                        self.set_now_playing(data[pattern] or None)
+
+            except (OSError, websocket.WebSocketException, json.JSONDecodeError) as err:
+                if self._stopped.is_set():
+                    break
+                self.log_d(f"live data stream unavailable ({err}), retrying in {wait}s")
+
+            finally:
+                if self._ws:
+                    self._ws.close()
+
+            # data may be stale while disconnected
+            self.set_now_playing(None)
+
+            self._stopped.wait(wait)
+            wait = min(wait * 2, self.RECONNECT_MAX_WAIT)
+
+    def check_file(self):
+        """Re-read the now playing file if its modification time or size changed since the last check."""
+        stat, now_playing = self.read_file(self._last_stat)
+        if stat == self._last_stat:
+            return
+        self._last_stat = stat
+
+        self.set_now_playing(now_playing)
+
+    def read_file(self, last_stat: tuple = None) -> tuple:
+        """Read the now playing file, unless its modification time and size equal `last_stat`.
+
+        :return: The file's `(mtime, size)`, or `None` if missing, and its now playing information.
+        """
+        path = self.cfg_get("path").replace("\\", "/")
 
-    def main(self, message):
         try:
-            path = self.cfg_get("path").replace("\\", "/")
-            with open(path, "r") as file:
-                return f"{file.readlines()[0]}"
-        except (FileNotFoundError, IndexError):
+            stat = os.stat(path)
+            stat = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stat = None
+
+        now_playing = None
+        if stat and stat != last_stat:
+            try:
+                with open(path, "r") as file:
+                    now_playing = file.readline().rstrip("\r\n") or None
+            except FileNotFoundError:
+                pass
+
+        return stat, now_playing
+
+    def set_now_playing(self, now_playing: str | None):
+        """Update the now playing information, notifying of the change if it differs."""
+        if now_playing == self.now_playing:
+            return
+
+        self.now_playing = now_playing
+        self.log_d(f"now playing changed to {now_playing}")
+        self.on_change(now_playing)
+
+    def on_change(self, now_playing: str | None):
+        """Notify subscribers, and chat if enabled, of a song change."""
+        if now_playing and self.cfg_get("announce_changes"):
+            try:
+                self._bot.send_message(f"Now playing: {now_playing}")
+            except Exception:
+                self.log_e(traceback.format_exc())
+
+        for callback in list(self.subscribers):
+            try:
+                callback(now_playing)
+            except Exception:
+                self.log_e(traceback.format_exc())
+
+    def main(self, message):
+        if not self.now_playing:
             return "No NP data found."
+        return self.now_playing
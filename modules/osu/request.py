@@ -3,12 +3,17 @@
 #   ^ Ctrl+F 'default_config' to find the fields
 # Create a command using cmd with %osu/request% in the response.
 
+from concurrent.futures import Future
+import copy
 import irc
+import queue
 import re
-from threading import Thread
+from threading import Lock, Thread, Timer
 import time
+import traceback
 
 from src.plugins import BaseModule
+from src.config import BASE_CONFIG_PATH
 from src.definitions import (
     Author,
     Message,
@@ -17,9 +22,17 @@ from src.definitions import (
 )
 
 from modules.osu.helpers.api2 import OsuAPIv2Helper
-
-OSU_LONG_RE = r"^https:\/\/osu.ppy.sh\/beatmapsets\/(\d+)\/?(?:#[a-z]+\/(\d+))?$"
-OSU_SHORT_RE = r"^https:\/\/osu.ppy.sh\/b(?:eatmaps)?\/(\d+)$"
+from modules.osu.helpers.cache import BeatmapCache
+from modules.osu.helpers.request_queue import RequestQueue
+
+OSU_LINK_RE = re.compile(
+    r"osu\.ppy\.sh/(?:"
+    r"(?:b|beatmaps)/(?P<beatmap>\d+)"
+    r"|(?:s|beatmapsets)/(?P<beatmapset>\d+)/?(?:#[a-z]+/(?P<setbeatmap>\d+))?"
+    r")",
+    re.IGNORECASE,
+)
+"""Regex matching every form of beatmap link: /b/, /beatmaps/, /s/ and /beatmapsets/ (with or without a difficulty)."""
 
 # See https://github.com/ppy/osu-api/wiki#response for more info
 OSU_STATUSES = [
@@ -52,6 +65,9 @@ OSU_MODS = [
     "V2",
 ]
 
+OSU_API_BATCH_LIMIT = 50
+"""Most beatmaps the osu! API returns from one multi-id lookup."""
+
 MESSAGE_OPT_RE = re.compile(r"(%([\/a-z0-9_]+)%)")
 
 MESSAGE_OPTIONS = {
@@ -87,26 +103,208 @@ MESSAGE_OPTIONS = {
 }
 
 
+OSU_IRC_MESSAGE_LIMIT = 450
+"""Longest message to send over osu! IRC when coalescing several requests into one."""
+
+OSU_IRC_COALESCE_SEPARATOR = " || "
+"""Separator between requests coalesced into one osu! IRC message."""
+
+
+class BeatmapBatcher:
+    """Collects beatmap lookups made within `window` seconds of each other into one multi-id API call.
+
+    Results are written to `cache` in bulk, and each caller gets their own copy of their map.
+    """
+
+    def __init__(self, api_helper: OsuAPIv2Helper, cache: BeatmapCache, window: float):
+        self.api_helper = api_helper
+        self.cache = cache
+        self.window = window
+
+        self._lock = Lock()
+        self._pending = dict()
+        self._timer = None
+
+    def get(self, beatmap_id: int) -> dict | None:
+        """Get information for the beatmap with ID `beatmap_id`, waiting for the batch it joins."""
+        batch = None
+
+        with self._lock:
+            future = self._pending.get(beatmap_id, None)
+            if future is None:
+                future = Future()
+                self._pending[beatmap_id] = future
+
+                if len(self._pending) >= OSU_API_BATCH_LIMIT:
+                    batch = self._take()
+                elif not self._timer:
+                    self._timer = Timer(self.window, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+        if batch:
+            self._fetch(batch)
+
+        map = future.result()
+        return copy.deepcopy(map) if map else None
+
+    def flush(self):
+        """Look up every pending beatmap now."""
+        with self._lock:
+            batch = self._take()
+        self._fetch(batch)
+
+    def _take(self) -> dict:
+        """Take the pending batch, leaving an empty one."""
+        batch = self._pending
+        self._pending = dict()
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _fetch(self, batch: dict):
+        if not batch:
+            return
+
+        maps = dict()
+        try:
+            result = self.api_helper.get_beatmaps(list(batch))
+            if result and "beatmaps" in result:
+                self.cache.put_beatmaps(result["beatmaps"])
+                maps = {map["id"]: map for map in result["beatmaps"]}
+
+        finally:
+            for beatmap_id, future in batch.items():
+                future.set_result(maps.get(beatmap_id, None))
+
+
+class TokenBucket:
+    """Token bucket rate limiter: allows bursts of up to `capacity`, refilling at `rate` tokens per second."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+
+    def wait(self):
+        """Block until a token is available, then take it."""
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._last) * self.rate
+            )
+            self._last = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+
+            time.sleep((1 - self._tokens) / self.rate)
+
+
 # TODO: replace this with modules.osu.helpers.api2.OsuAPIv2Helper.message_self() once supported by osuAPIv2
 class OsuRequestsIRCBot(irc.bot.SingleServerIRCBot):
-    def __init__(self, user, server, port=6667, password=None, log_i=None):
+    RECONNECT_WAIT = 5
+    """Time to wait before retrying a send while disconnected, in seconds."""
+
+    def __init__(
+        self,
+        user,
+        server,
+        port=6667,
+        password=None,
+        log_i=None,
+        rate: float = 1,
+        burst: int = 4,
+        queue_size: int = 100,
+        coalesce_window: float = 0,
+    ):
+        """Create a new `OsuRequestsIRCBot`.
+
+        Messages are sent from a bounded outbound queue, rate-limited with a token bucket
+        so Bancho does not silently drop them.
+
+        :param rate: Messages per second to send at most, on average.
+        :param burst: Messages that can be sent at once after a quiet period.
+        :param queue_size: Most messages that can wait to be sent.
+        :param coalesce_window: Seconds to wait for more messages to send together as one. 0 to disable.
+        """
         irc.bot.SingleServerIRCBot.__init__(
             self, [(server, port, password)], user, user
         )
         self.user = user
         self.log_i = log_i
 
+        self.outbound = queue.Queue(queue_size)
+        self.bucket = TokenBucket(rate, burst)
+        self.coalesce_window = coalesce_window
+        self._held = None
+        """A message taken from the queue that could not be coalesced, sent next."""
+
+        self.sender_thread = Thread(target=self.sender, daemon=True)
+        self.sender_thread.start()
+
     def on_welcome(self, c, e):
         self.log_i(f"osu! IRC Connected as {self.user}")
 
-    def send_message(self, msg: str):
-        self.connection.privmsg(self.user, msg)
+    def send_message(self, msg: str) -> bool:
+        """Queue `msg` to be sent.
+
+        :return: Whether the message was queued; `False` if the queue is full.
+        """
+        try:
+            self.outbound.put_nowait(msg)
+            return True
+        except queue.Full:
+            return False
+
+    def next_message(self) -> str:
+        """Wait for the next message to send, coalescing any more that arrive within `coalesce_window`."""
+        msg = self.outbound.get()
+        if not self.coalesce_window:
+            return msg
+
+        deadline = time.monotonic() + self.coalesce_window
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                extra = self.outbound.get(timeout=remaining)
+            except queue.Empty:
+                break
+
+            combined = f"{msg}{OSU_IRC_COALESCE_SEPARATOR}{extra}"
+            if len(combined) > OSU_IRC_MESSAGE_LIMIT:
+                # too long to combine: send what we have, and keep this for the next message
+                self._held = extra
+                break
+            msg = combined
+
+        return msg
+
+    def sender(self):
+        """Send queued messages forever, holding on to them while disconnected."""
+        while True:
+            if self._held:
+                msg, self._held = self._held, None
+            else:
+                msg = self.next_message()
+
+            self.bucket.wait()
+            while True:
+                try:
+                    if self.connection.is_connected():
+                        self.connection.privmsg(self.user, msg)
+                        break
+                except irc.client.ServerNotConnectedError:
+                    pass
+
+                # SingleServerIRCBot reconnects on its own; keep the message until it does
+                time.sleep(self.RECONNECT_WAIT)
 
 
 class Module(BaseModule):
-    helpmsg = (
-        "Request an osu! beatmap to be played. Usage: request <beatmap link> <+mods?>"
-    )
+    helpmsg = "Request an osu! beatmap to be played, or see/manage the request queue. Usage: request <beatmap link> <+mods?> / request list / request <skip/clear> <position?>"
 
     default_config = {
         # Your osu! ID. Go to your profile on the website and this should be in the URL.
@@ -122,10 +320,36 @@ class Module(BaseModule):
         "parse_all_messages": True,
         # Whether or not to inform user of requests handled using parse_all_messages.
         "respond_all_messages": True,
+        # How many beatmaps and beatmap sets to keep cached in memory. All are also cached on disk.
+        "beatmap_cache_size": 512,
+        # Seconds to collect beatmap lookups for, so simultaneous requests share one API call. 0 to disable.
+        "beatmap_batch_window": 0.25,
+        # How many background workers resolve and send requests found with parse_all_messages.
+        "request_workers": 8,
+        # Most osu! IRC messages to send per second, on average, and at once after a quiet period.
+        "osu_irc_rate": 1,
+        "osu_irc_burst": 4,
+        # Most requests that can wait to be sent to osu! IRC. Requests past this are refused.
+        "osu_irc_queue_size": 100,
+        # Seconds to wait for more requests to send together as one osu! message. 0 to disable.
+        "osu_irc_coalesce_window": 0,
+        # Most requests that can be in the queue at once, and per user. 0 for no limit.
+        "queue_max_size": 0,
+        "queue_per_user": 0,
+        # Seconds after which a request leaves the queue, allowing the map to be requested again. 0 to keep
+        # requests until skipped or cleared.
+        "queue_expiry": 1800,
+        # Star rating and length (in seconds) limits for requested maps. 0 for no limit.
+        "min_stars": 0,
+        "max_stars": 0,
+        "max_length": 0,
     }
 
     consumes = 2
 
+    WORKER_SHUTDOWN_TIMEOUT = 5
+    """Seconds to wait for each request worker to finish when unloading."""
+
     def __init__(self, bot, name):
         BaseModule.__init__(self, bot, name)
 
@@ -133,14 +357,45 @@ class Module(BaseModule):
         self.cooldown = self.cfg_get("cd_per_user")
         self.author_cds = dict()
 
-        # get api v2 helper
+        # get the shared api v2 helper; reused across imports and reloads of this module
         self.api_helper = OsuAPIv2Helper(
             f"{self._bot.channel_id}/modules/osu/helpers/api2.txt"
         )
 
-        # compile mapID regex
-        self.beatmap_re = re.compile(OSU_LONG_RE)
-        self.b_re = re.compile(OSU_SHORT_RE)
+        # cache beatmap information so repeat requests don't cost an API call
+        self.beatmap_cache = BeatmapCache(
+            f"{BASE_CONFIG_PATH}/{self._bot.channel_id}/modules/osu/beatmaps.db",
+            self.cfg_get("beatmap_cache_size"),
+        )
+
+        self.beatmap_batcher = None
+        if self.cfg_get("beatmap_batch_window"):
+            self.beatmap_batcher = BeatmapBatcher(
+                self.api_helper, self.beatmap_cache, self.cfg_get("beatmap_batch_window")
+            )
+
+        # track requested maps so duplicates are refused and the queue survives restarts
+        self.request_queue = RequestQueue(
+            f"{BASE_CONFIG_PATH}/{self._bot.channel_id}/modules/osu/request_queue.jsonl",
+            self.cfg_get("queue_max_size"),
+            self.cfg_get("queue_per_user"),
+            self.cfg_get("queue_expiry"),
+        )
+        if len(self.request_queue):
+            Thread(target=self.hydrate_cache, daemon=True).start()
+
+        # resolve requests found in chat off the chat thread. each worker has its own queue,
+        # and a user's requests always go to the same worker so they are handled in order
+        self.request_queues = []
+        self.request_workers = []
+        for _ in range(max(1, self.cfg_get("request_workers"))):
+            request_queue = queue.SimpleQueue()
+            worker = Thread(
+                target=self.request_worker, args=(request_queue,), daemon=True
+            )
+            worker.start()
+            self.request_queues.append(request_queue)
+            self.request_workers.append(worker)
 
         # resolve username
         self.username = self.resolve_username(self.cfg_get("osu_trgt_id"))
@@ -152,12 +407,96 @@ class Module(BaseModule):
                 "irc.ppy.sh",
                 password=self.cfg_get("osu_irc_pwd"),
                 log_i=self.log_i,
+                rate=self.cfg_get("osu_irc_rate"),
+                burst=self.cfg_get("osu_irc_burst"),
+                queue_size=self.cfg_get("osu_irc_queue_size"),
+                coalesce_window=self.cfg_get("osu_irc_coalesce_window"),
             )
 
             self.osu_irc_bot_thread = Thread(target=self.osu_irc_bot.start)
             self.osu_irc_bot_thread.daemon = True
             self.osu_irc_bot_thread.start()
 
+    def __del__(self):
+        for request_queue in self.request_queues:
+            request_queue.put(None)
+
+        # let requests already being handled finish before closing what they use
+        for worker in self.request_workers:
+            worker.join(self.WORKER_SHUTDOWN_TIMEOUT)
+
+        self.beatmap_cache.close()
+        self.request_queue.close()
+
+    def request_worker(self, request_queue: queue.SimpleQueue):
+        """Resolve and send requests from `request_queue` until given `None`."""
+        while True:
+            job = request_queue.get()
+            if job is None:
+                return
+
+            author, args = job
+            try:
+                response = self.process_request(author, args, batch=True)
+                if (
+                    self.cfg_get("respond_all_messages")
+                    and NO_MESSAGE_SIGNAL not in response
+                ):
+                    # TODO: make this use command response format from a request command?
+                    self._bot.send_message(f"@{author.name} > {response}")
+
+            except Exception:
+                self.log_e(f"failed to process request from {author.name}:")
+                self.log_e(traceback.format_exc())
+
+    def get_beatmap(self, beatmap_id: int, batch: bool = False) -> dict:
+        """Get information for the beatmap with ID `beatmap_id`, from the cache if possible.
+
+        :param beatmap_id: The ID of the beatmap.
+        :param batch: Whether to wait to share an API call with other lookups, if batching is enabled.
+            Only for callers off the chat thread, as it blocks for the batch window.
+        """
+        map = self.beatmap_cache.get_beatmap(beatmap_id)
+        if map:
+            self.log_d(f"beatmap id {beatmap_id} found in cache")
+            return map
+
+        self.log_d(f"retrieving osu map info for beatmap id {beatmap_id}")
+        if batch and self.beatmap_batcher:
+            return self.beatmap_batcher.get(int(beatmap_id))
+
+        map = self.api_helper.get_beatmap(beatmap_id)
+        self.beatmap_cache.put_beatmap(map)
+        return map
+
+    def hydrate_cache(self):
+        """Cache information for every queued beatmap that isn't already, in as few API calls as possible."""
+        missing = [
+            entry["id"]
+            for entry in self.request_queue.list()
+            if not self.beatmap_cache.get_beatmap(entry["id"])
+        ]
+
+        for i in range(0, len(missing), OSU_API_BATCH_LIMIT):
+            result = self.api_helper.get_beatmaps(missing[i : i + OSU_API_BATCH_LIMIT])
+            if result and "beatmaps" in result:
+                self.beatmap_cache.put_beatmaps(result["beatmaps"])
+
+        if missing:
+            self.log_d(f"hydrated beatmap cache with {len(missing)} queued maps")
+
+    def get_beatmapset(self, beatmapset_id: int) -> dict:
+        """Get maps and information for the beatmap set with ID `beatmapset_id`, from the cache if possible."""
+        mapset = self.beatmap_cache.get_beatmapset(beatmapset_id)
+        if mapset:
+            self.log_d(f"beatmapset id {beatmapset_id} found in cache")
+            return mapset
+
+        self.log_d(f"retrieving beatmapset info for beatmapset id {beatmapset_id}")
+        mapset = self.api_helper.get_beatmapset(beatmapset_id)
+        self.beatmap_cache.put_beatmapset(mapset)
+        return mapset
+
     def resolve_username(self, id: (str | int)) -> str | None:
         """Resolves a users' osu! username from their ID.
         :param id: The ID of the osu! user to resolve the name for.
@@ -202,27 +541,110 @@ class Module(BaseModule):
         self.log_d(modstring)
         return modstring
 
-    def format_message(self, map) -> str:
-        """Format map information for `map` using `message_format` from the config.
-        :param map: The map object as returned from the osu! API
-        :return: The message to send as formatted using `message_format`
+    def compile_message_format(self):
+        """Compile `message_format` from the config into `self.message_parts`:
+        literal strings, and `MESSAGE_OPTIONS` functions to call with the map.
+
+        Invalid keys are logged once here and kept as literal text.
         """
         message = self.cfg_get("message_format")
 
-        for flag, option in MESSAGE_OPT_RE.findall(message):
+        parts = []
+        last = 0
+        for match in MESSAGE_OPT_RE.finditer(message):
+            flag, option = match.groups()
             if option not in MESSAGE_OPTIONS:
                 self.log_e(f"config error: message_format uses invalid key '{option}'")
                 continue
 
-            message = message.replace(flag, str(MESSAGE_OPTIONS[option](map)))
+            if match.start() > last:
+                parts.append(message[last : match.start()])
+            parts.append(MESSAGE_OPTIONS[option])
+            last = match.end()
 
-        return message
+        if last < len(message):
+            parts.append(message[last:])
+
+        self.message_parts = parts
+
+    def reload_config(self):
+        BaseModule.reload_config(self)
+        self.compile_message_format()
+
+    def cfg_set(self, key: str, value):
+        BaseModule.cfg_set(self, key, value)
+        if key == "message_format":
+            self.compile_message_format()
+
+    def format_message(self, map) -> str:
+        """Format map information for `map` using `message_format` from the config.
+        :param map: The map object as returned from the osu! API
+        :return: The message to send as formatted using `message_format`
+        """
+        return "".join(
+            [part if isinstance(part, str) else str(part(map)) for part in self.message_parts]
+        )
 
     def main(self, message: Message):
         args = self.get_args(message)
 
+        if args and args[0].lower() in ["list", "skip", "clear"]:
+            return self.manage_queue(message.author, args)
+
         return self.process_request(message.author, args)
 
+    def manage_queue(self, author: Author, args: list) -> str:
+        """List the request queue, or skip or clear entries (moderators only)."""
+        action = args[0].lower()
+
+        if action == "list":
+            entries = self.request_queue.list(5)
+            if not entries:
+                return "The request queue is empty."
+
+            listing = " | ".join(
+                [
+                    f"{i + 1}. {entry['name']} ({entry['requester']})"
+                    for i, entry in enumerate(entries)
+                ]
+            )
+            return f"Queue ({len(self.request_queue)}): {listing}"
+
+        if author.priv < Author.Privilege.MOD:
+            return "You must be a moderator to do that."
+
+        if action == "skip":
+            try:
+                position = int(args[1]) if len(args) > 1 else 1
+            except ValueError:
+                return "Give a valid integer for position."
+
+            entry = self.request_queue.skip(position)
+            if not entry:
+                return f"There is no request at position {position}."
+            return f"Removed {entry['name']} ({entry['requester']}) from the queue."
+
+        count = self.request_queue.clear()
+        return f"Cleared {count} requests from the queue."
+
+    def check_filters(self, map: dict) -> str | None:
+        """Check `map` against the configured star rating and length limits.
+
+        :return: The reason the map was refused, or `None` if it is allowed.
+        """
+        stars = map["difficulty_rating"]
+        min_stars = self.cfg_get("min_stars")
+        max_stars = self.cfg_get("max_stars")
+        max_length = self.cfg_get("max_length")
+
+        if min_stars and stars < min_stars:
+            return f"Requested maps must be at least {min_stars}*."
+        if max_stars and stars > max_stars:
+            return f"Requested maps must be at most {max_stars}*."
+        if max_length and int(map["total_length"]) > max_length:
+            return f"Requested maps must be at most {MESSAGE_OPTIONS['length']({'total_length': max_length})} long."
+        return None
+
     def on_pubmsg(self, message: Message):
         if not self.cfg_get("parse_all_messages"):
             return
@@ -231,24 +653,31 @@ class Module(BaseModule):
         if message.cmd:
             return
 
-        words = message.text_raw.split(" ")
-        for i, word in enumerate(words):
-            if "osu.ppy.sh/b" not in word:
-                continue
-
-            args = words[i:]
-            response = self.process_request(message.author, args)
-            if (
-                self.cfg_get("respond_all_messages")
-                and NO_MESSAGE_SIGNAL not in response
-            ):
-                # TODO: make this use command response format from a request command?
-                self._bot.send_message(f"@{message.author.name} > {response}")
+        # cheap rejection for the vast majority of messages (case-insensitive, like OSU_LINK_RE)
+        text = message.text_raw
+        if "osu.ppy.sh" not in text.lower():
+            return
 
-            # only process first map
+        # only process first map
+        link = OSU_LINK_RE.search(text)
+        if not link:
             return
 
-    def process_request(self, author: Author, args):
+        # the word after the link, if any, is the mods
+        args = [link[0], *text[link.end() :].split(maxsplit=1)[:1]]
+
+        # hand off to a worker
+        worker = hash(message.author.uid) % len(self.request_queues)
+        self.request_queues[worker].put((message.author, args))
+
+    def process_request(self, author: Author, args, batch: bool = False):
+        """Resolve, queue, and send a request for the map linked in `args`.
+
+        :param author: The author of the request.
+        :param args: The link to the map, and optionally the mods.
+        :param batch: Whether beatmap lookups may wait to be batched; see `get_beatmap`.
+        :return: The response to give the requester.
+        """
         # do not continue if either username or target failed to resolve
         if not self.username:
             return (
@@ -281,59 +710,68 @@ class Module(BaseModule):
         if len(args) > 1:
             mods = self.generate_mods_string(args[1].upper())
 
-        # get map info; use full re first as it's more common
-        if self.beatmap_re.match(req):
-            # returns [()]? oh well, grab [0] so we have ()
-            ids = self.beatmap_re.findall(req)[0]
+        # get map info
+        link = OSU_LINK_RE.search(req)
+        if not link:
+            return "Could not resolve beatmap link format."
 
-            # if mapid isn't empty use it
-            if ids[1]:
-                # beatmap
-                id = ids[1]
-                self.log_d(f"retrieving osu map info for beatmap id {id}")
-                map = self.api_helper.get_beatmap(id)
+        # if a difficulty is linked use it
+        id = link["beatmap"] or link["setbeatmap"]
+        if id:
+            map = self.get_beatmap(id, batch)
 
-            # if mapid is empty use mapsetid
-            else:
-                # beatmapset
-                id = ids[0]
-                self.log_d(f"retrieving top diff info for beatmapset id {id}")
-                mapset = self.api_helper.get_beatmapset(id)
-                maps = mapset["beatmaps"]
-                # sort mapset descending by difficulty so req[0] gives top diff
-                maps.sort(key=lambda m: m["difficulty_rating"], reverse=True)
-                map = maps[0]
-                # set map mapset to mapset for use within formatting
-                map["beatmapset"] = mapset
-
-        # use short re? (osu.ppy.sh/b/id)
-        elif self.b_re.match(req):
-            id = self.b_re.findall(req)[0]
-            self.log_d(f"retrieving osu map info for beatmap id {id}")
-            map = self.api_helper.get_beatmap(id)
-
-        # give up
+        # otherwise use the beatmapset's top diff
         else:
-            return "Could not resolve beatmap link format."
-
-        if not map:
+            id = link["beatmapset"]
+            self.log_d(f"resolving top diff for beatmapset id {id}")
+            mapset = self.get_beatmapset(id)
+            maps = mapset["beatmaps"]
+            # sort mapset descending by difficulty so req[0] gives top diff
+            maps.sort(key=lambda m: m["difficulty_rating"], reverse=True)
+            map = maps[0]
+            # set map mapset to mapset for use within formatting
+            map["beatmapset"] = mapset
+
+        if not map or "id" not in map:
             return "Could not retrieve beatmap information."
 
+        refused = self.check_filters(map)
+        if refused:
+            return refused
+
+        # add to queue; refuses duplicates and users over their limit
+        refused = self.request_queue.add(
+            {
+                "id": map["id"],
+                "name": f"{map['beatmapset']['artist']} - {map['beatmapset']['title']} [{map['version']}]",
+                "requester": author.name,
+                "uid": author.uid,
+                "stars": map["difficulty_rating"],
+                "length": int(map["total_length"]),
+                "time": time.time(),
+            }
+        )
+        if refused:
+            return refused
+
         # add request mods to map dict and format the message
         map["mods"] = mods
         map["sender"] = author
         message = self.format_message(map)
 
         # send message, set cooldown and inform requester
-        self.send_osu_message(message)
+        if not self.send_osu_message(message):
+            self.request_queue.remove(map["id"])
+            return "Too many requests are waiting to be sent. Please try again later."
         self.author_cds[author.uid] = time.time()
 
         return f"{map['beatmapset']['artist']} - {map['beatmapset']['title']} | Request sent!"
 
-    def send_osu_message(self, msg: str):
-        """Send `msg` as an osu! message to `target` as `username`
+    def send_osu_message(self, msg: str) -> bool:
+        """Queue `msg` to be sent as an osu! message to `target` as `username`
         :param msg: The message to send
+        :return: Whether the message was queued
         """
-        self.log_d(f"sending osu! message to {self.username}: '{msg}'")
+        self.log_d(f"queueing osu! message to {self.username}: '{msg}'")
 
-        self.osu_irc_bot.send_message(msg)
+        return self.osu_irc_bot.send_message(msg)
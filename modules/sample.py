@@ -49,3 +49,8 @@ class Module(BaseModule):
     # This runs on all messages regardless of whether the command is called.
     def on_pubmsg(self, message: Message):
         self.count += 1
+
+    # This runs on every EventSub event the bot receives, e.g. follows and channel point redemptions.
+    def on_event(self, type: str, event: dict):
+        if type == "channel.follow":
+            self._bot.send_message(f"Thanks for the follow, {event['user_name']}!")
@@ -6,26 +6,296 @@ from src.plugins import BaseModule
 from src.config import BASE_CONFIG_PATH
 from src.definitions import Author, Message, RepeatTimer
 
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+import csv
+import json
 import os
+import queue
 import random
 import sqlite3
+import threading
+import time
+
+XP_GRANT_SQL = """
+INSERT INTO xp (user, amt) VALUES (?, ?)
+ON CONFLICT (user) DO UPDATE SET amt = amt + excluded.amt
+"""
+"""Parameterized upsert granting XP to a user, creating them if they are not tracked yet."""
+
+XP_HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS xp_log (ts INTEGER, user, amt);
+CREATE INDEX IF NOT EXISTS xp_log_ts ON xp_log (ts);
+CREATE TABLE IF NOT EXISTS xp_hourly (
+    bucket INTEGER,
+    user,
+    amt,
+    PRIMARY KEY (bucket, user)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS xp_hourly_user ON xp_hourly (user, bucket);
+CREATE TABLE IF NOT EXISTS xp_daily (
+    bucket INTEGER,
+    user,
+    amt,
+    PRIMARY KEY (bucket, user)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS xp_daily_user ON xp_daily (user, bucket);
+"""
+"""Grant history: raw per-tick grants in `xp_log`, rolled up into hourly then daily buckets.
+
+Each row lives in exactly one of the three tables, so they can be summed together without double counting.
+"""
+
+XP_HISTORY_GAINED_SQL = """
+SELECT user, SUM(amt) AS gained FROM (
+    SELECT user, amt FROM xp_log WHERE ts >= ?1
+    UNION ALL SELECT user, amt FROM xp_hourly WHERE bucket >= ?1 - ?1 % 3600
+    UNION ALL SELECT user, amt FROM xp_daily WHERE bucket >= ?1 - ?1 % 86400
+)
+"""
+"""XP gained per user since timestamp `?1`, to the precision of the buckets covering it."""
+
+XP_TRANSFER_CHUNK_SIZE = 10000
+"""Amount of rows to read or write at once when exporting or importing XP."""
+
+XP_TRANSFER_FORMATS = [".csv", ".jsonl"]
+"""File formats XP can be exported to and imported from."""
+
+XP_DB_CACHE_SIZE = -16000
+"""Page cache size for each connection to the XP database (negative values are in KiB)."""
+
+
+class _LeaderboardNode:
+    __slots__ = ("key", "priority", "left", "right", "size")
+
+    def __init__(self, key: tuple, priority: float):
+        self.key = key
+        self.priority = priority
+        self.left = None
+        self.right = None
+        self.size = 1
+
+
+def _size(node: _LeaderboardNode) -> int:
+    return node.size if node else 0
+
+
+def _update(node: _LeaderboardNode):
+    node.size = 1 + _size(node.left) + _size(node.right)
+
+
+def _split(node: _LeaderboardNode, key: tuple) -> tuple:
+    """Split `node` into trees holding keys `< key` and keys `>= key`."""
+    if not node:
+        return None, None
+
+    if node.key < key:
+        left, right = _split(node.right, key)
+        node.right = left
+        _update(node)
+        return node, right
+
+    left, right = _split(node.left, key)
+    node.left = right
+    _update(node)
+    return left, node
+
+
+def _merge(left: _LeaderboardNode, right: _LeaderboardNode) -> _LeaderboardNode:
+    """Merge two trees where every key in `left` is smaller than every key in `right`."""
+    if not left:
+        return right
+    if not right:
+        return left
+
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+def _delete(node: _LeaderboardNode, key: tuple) -> _LeaderboardNode:
+    if node.key == key:
+        return _merge(node.left, node.right)
+
+    if key < node.key:
+        node.left = _delete(node.left, key)
+    else:
+        node.right = _delete(node.right, key)
+
+    _update(node)
+    return node
+
+
+class Leaderboard:
+    """In-memory order-statistics tree (a size-augmented treap) of users ranked by XP.
+
+    Users are ordered by XP descending, then by name, matching the SQL rank queries.
+    Updates, rank lookups and user-at-rank lookups are O(log n); top-k is O(log n + k).
+    """
+
+    def __init__(self):
+        self._root = None
+        self._amts = dict()
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_rows(cls, rows: list):
+        """Build a leaderboard in O(n) from `(user, amt)` rows sorted by `amt DESC, user`."""
+        board = cls()
+        keys = []
+        for user, amt in rows:
+            board._amts[user] = amt
+            keys.append((-amt, user))
+
+        def build(lo: int, hi: int) -> _LeaderboardNode:
+            if lo >= hi:
+                return None
+            mid = (lo + hi) // 2
+            node = _LeaderboardNode(keys[mid], 0)
+            node.left = build(lo, mid)
+            node.right = build(mid + 1, hi)
+            _update(node)
+            return node
+
+        board._root = build(0, len(keys))
+
+        # hand out priorities in breadth-first order so parents always outrank children
+        priorities = sorted((random.random() for _ in keys), reverse=True)
+        queue = deque([board._root] if board._root else [])
+        for priority in priorities:
+            node = queue.popleft()
+            node.priority = priority
+            for child in (node.left, node.right):
+                if child:
+                    queue.append(child)
+
+        return board
+
+    def __len__(self) -> int:
+        return len(self._amts)
+
+    def get(self, user: str) -> int | None:
+        """Return the XP of `user`, or `None` if they are not tracked."""
+        return self._amts.get(user, None)
+
+    def set(self, user: str, amt: int):
+        """Set the XP of `user` to `amt`, tracking them if they are not already."""
+        with self._lock:
+            old = self._amts.get(user, None)
+            if old is not None:
+                self._root = _delete(self._root, (-old, user))
+
+            self._amts[user] = amt
+            key = (-amt, user)
+            left, right = _split(self._root, key)
+            node = _LeaderboardNode(key, random.random())
+            self._root = _merge(_merge(left, node), right)
+
+    def add(self, user: str, amt: int):
+        """Add `amt` XP to `user`, tracking them if they are not already."""
+        with self._lock:
+            self.set(user, self._amts.get(user, 0) + amt)
+
+    def remove(self, user: str):
+        """Stop tracking `user`."""
+        with self._lock:
+            old = self._amts.pop(user, None)
+            if old is not None:
+                self._root = _delete(self._root, (-old, user))
+
+    def rank(self, user: str) -> int | None:
+        """Return the 0-based position of `user`, or `None` if they are not tracked."""
+        with self._lock:
+            amt = self._amts.get(user, None)
+            if amt is None:
+                return None
+
+            key = (-amt, user)
+            index = 0
+            node = self._root
+            while node:
+                if key < node.key:
+                    node = node.left
+                elif key > node.key:
+                    index += _size(node.left) + 1
+                    node = node.right
+                else:
+                    return index + _size(node.left)
+
+    def at(self, index: int) -> tuple | None:
+        """Return `(user, amt)` at 0-based position `index`, or `None` if out of range."""
+        with self._lock:
+            if index < 0 or index >= _size(self._root):
+                return None
+
+            node = self._root
+            while True:
+                left = _size(node.left)
+                if index < left:
+                    node = node.left
+                elif index > left:
+                    index -= left + 1
+                    node = node.right
+                else:
+                    return (node.key[1], -node.key[0])
+
+    def top(self, k: int) -> list:
+        """Return the top `k` users as `(user, amt)`."""
+        with self._lock:
+            result = []
+            stack = []
+            node = self._root
+            while (stack or node) and len(result) < k:
+                if node:
+                    stack.append(node)
+                    node = node.left
+                else:
+                    node = stack.pop()
+                    result.append((node.key[1], -node.key[0]))
+                    node = node.right
+            return result
 
 
 class Module(BaseModule):
-    helpmsg = f"Get how much XP a user has, see the top 3, or get a user at a specific rank. Usage: xp <username?> / xp top <rank?>"
+    helpmsg = f"Get how much XP a user has, see the top 3, get a user at a specific rank, or see XP gained this week/stream. Usage: xp <username?> / xp top <rank?> / xp <week/stream> <username?>"
 
     default_config = {
         # Amount of seconds between each grant. Default is 60 (1 minute).
         "xp_grant_frequency": 60,
+        # Whether to only grant XP while the channel is live.
+        "xp_live_only": False,
         # Amount (min, max) to grant to inactive users. Default is (1, 1).
         "xp_inactive_range": [1, 1],
         # Amount (min, max) to grant to active users. Default is (2, 3).
         "xp_active_range": [2, 3],
+        # Extra XP granted to active users for each message after their first in a grant window.
+        # Default is 0 (every active user gets the same bonus no matter how much they chat).
+        "xp_active_message_bonus": 0,
+        # Maximum extra XP an active user can get from xp_active_message_bonus per grant.
+        "xp_active_message_bonus_max": 5,
         # Amount of XP required for level 2.
         "level_requirement": 30,
         # Additional amount of XP (multiplicative) required for each new level.
         "level_increment": 1.2,
         "omit_users": [],
+        # Whether to keep the leaderboard in memory for fast rank/top lookups instead of querying SQLite.
+        # Costs memory proportional to the amount of tracked users. Requires a restart to take effect.
+        "leaderboard_in_memory": False,
+        # Whether to keep a history of grants, for "xp week" and "xp stream" leaderboards.
+        "xp_history": True,
+        # Minutes to keep raw per-grant history before rolling it up into hourly totals.
+        "xp_history_raw_minutes": 10,
+        # Days to keep hourly totals before rolling them up into daily totals.
+        "xp_history_hourly_days": 2,
+        # Days to keep daily totals before deleting them.
+        "xp_history_daily_days": 90,
     }
 
     consumes = 5
@@ -38,15 +308,18 @@ class Module(BaseModule):
 
         # init the sqlite3 connection
         try:
-            self.db = sqlite3.connect(self.db_path)
+            setup_db = self.connect()
 
         except sqlite3.OperationalError:
             # Make folder and reattempt init
             os.mkdir("modules/xp_store")
-            self.db = sqlite3.connect(self.db_path)
+            setup_db = self.connect()
+
+        # Use write-ahead logging so lookups never wait on a grant transaction
+        setup_db.execute("PRAGMA journal_mode = WAL")
 
         # Create the table if it doesn't exist
-        self.db.execute(
+        setup_db.execute(
             """
         CREATE TABLE IF NOT EXISTS xp (
             user,
@@ -56,8 +329,39 @@ class Module(BaseModule):
         """
         )
 
-        # Create active users array for activity bonus
-        self.active_users = []
+        # Index XP amounts so rank and leaderboard queries never scan the whole table
+        setup_db.execute("CREATE INDEX IF NOT EXISTS xp_amt ON xp (amt DESC, user)")
+        setup_db.executescript(XP_HISTORY_SCHEMA)
+        setup_db.commit()
+        setup_db.close()
+
+        # All writes go through a queue to a single connection owned by this module's thread,
+        # reads borrow a connection from the pool
+        self.write_queue = queue.SimpleQueue()
+        self.read_pool = queue.SimpleQueue()
+
+        # Counts write jobs run, so cached reads can tell whether they are stale
+        self.write_version = 0
+
+        # Top 3 gained per period, as `period: (key, rows)`, reused until the next write
+        self.top_gained = dict()
+
+        # Set once the writer is told to stop, guarded so no job is queued after the stop
+        self.closed = False
+        self.write_lock = threading.Lock()
+
+        # Load the in-memory leaderboard, if enabled
+        self.leaderboard = None
+        if self.cfg_get("leaderboard_in_memory"):
+            with self.reader() as db:
+                self.leaderboard = Leaderboard.from_rows(
+                    db.execute("SELECT user, amt FROM xp ORDER BY amt DESC, user")
+                )
+            self.log_i(f"loaded {len(self.leaderboard)} users into leaderboard")
+
+        # Message counts of users active in the current grant window, for activity bonus
+        self.active_users = dict()
+        self.active_users_lock = threading.Lock()
 
         # Tick XP every XP_GRANT_FREQUENCY seconds
         self.timer = RepeatTimer(self.cfg_get("xp_grant_frequency"), self.tick)
@@ -66,119 +370,628 @@ class Module(BaseModule):
     def __del__(self):
         self.timer.cancel()
 
+        with self.write_lock:
+            self.closed = True
+            self.write_queue.put(None)
+
+    def connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        """Open a new connection to the XP database with tuned pragmas."""
+        db = sqlite3.connect(self.db_path, check_same_thread=check_same_thread)
+        db.execute("PRAGMA synchronous = NORMAL")
+        db.execute(f"PRAGMA cache_size = {XP_DB_CACHE_SIZE}")
+        return db
+
+    @contextmanager
+    def reader(self):
+        """Borrow a read-only connection from the pool, opening a new one if none are free."""
+        try:
+            db = self.read_pool.get_nowait()
+        except queue.Empty:
+            db = self.connect(check_same_thread=False)
+            db.execute("PRAGMA query_only = ON")
+
+        try:
+            yield db
+        finally:
+            self.read_pool.put(db)
+
+    def write(self, job, wait: bool = True):
+        """Queue `job` to run in its own transaction on the writer connection.
+
+        :param job: A function taking the writer `sqlite3.Connection`.
+        :param wait: Whether to block until the job has run.
+        :return: What `job` returned if waiting, otherwise a `Future` for it.
+        :raises RuntimeError: If the module is being unloaded, so the job would never run.
+        """
+        future = Future()
+        with self.write_lock:
+            if self.closed:
+                raise RuntimeError("XP database is closed")
+            self.write_queue.put((job, future))
+
+        if wait:
+            return future.result()
+        return future
+
+    def run(self):
+        """Writer loop: run queued write jobs one at a time until `__del__` is called."""
+        db = self.connect()
+
+        while True:
+            item = self.write_queue.get()
+            if item is None:
+                break
+
+            job, future = item
+            try:
+                with db:
+                    result = job(db)
+                self.write_version += 1
+                future.set_result(result)
+
+            except Exception as err:
+                self.log_e(f"write failed: {err}")
+                future.set_exception(err)
+
+        db.close()
+
+        # close pooled read connections
+        while True:
+            try:
+                self.read_pool.get_nowait().close()
+            except queue.Empty:
+                break
+
     # Get viewerlist and do XP gain logic
     def tick(self):
-        self.log_d(f"running XP grant logic")
-        # Create a new connection for this thread
-        thread_db = sqlite3.connect(self.db_path)
+        if self.cfg_get("xp_live_only") and not self._bot.stream_handler.live:
+            self.log_d(f"channel is offline, skipping XP grant")
+            with self.active_users_lock:
+                self.active_users = dict()
+            return
 
-        users = self._bot.auth.get_all_chatters(self._bot.channel_id, self._bot.user_id)
-
-        # Give XP to each user
+        self.log_d(f"running XP grant logic")
+        users = self._bot.presence_handler.snapshot()
+
+        # Read config once per tick rather than once per user
+        omit_users = set(self.cfg_get("omit_users"))
+        active_range = self.cfg_get("xp_active_range")
+        inactive_range = self.cfg_get("xp_inactive_range")
+        message_bonus = self.cfg_get("xp_active_message_bonus")
+        message_bonus_max = self.cfg_get("xp_active_message_bonus_max")
+
+        # Swap out active users so messages from here on count towards the next window
+        with self.active_users_lock:
+            active_users = self.active_users
+            self.active_users = dict()
+
+        # Resolve how much XP to grant to each user
+        grants = []
         for user in users:
-            user = user.lower()
-            if user in self.cfg_get("omit_users"):
+            if user in omit_users:
                 continue
 
-            # Resolve how much XP to grant to this user
-            active_range = self.cfg_get("xp_active_range")
-            inactive_range = self.cfg_get("xp_inactive_range")
-            if user in self.active_users:
+            if user in active_users:
                 amt = random.randint(active_range[0], active_range[1])
+                if message_bonus:
+                    amt += min(
+                        message_bonus * (active_users[user] - 1), message_bonus_max
+                    )
             else:
                 amt = random.randint(inactive_range[0], inactive_range[1])
 
-            # Grant it to the user
-            thread_db.execute("INSERT OR IGNORE INTO xp VALUES(?,?)", (user, 0))
-            thread_db.execute(f'UPDATE xp SET amt = amt + {amt} WHERE user = "{user}"')
+            grants.append((user, amt))
+
+        self.grant(grants)
+
+    def grant(self, grants: list):
+        """Grant XP to many users in one transaction, recording it in the history if enabled.
+
+        :param grants: A list of `(user, amt)` to grant
+        """
+        history = self.cfg_get("xp_history")
+
+        def job(db: sqlite3.Connection):
+            db.executemany(XP_GRANT_SQL, grants)
+            if history:
+                now = int(time.time())
+                db.executemany(
+                    "INSERT INTO xp_log VALUES (?, ?, ?)",
+                    ((now, user, amt) for user, amt in grants),
+                )
+                self.compact_history(db, now)
+            db.commit()
+
+            if self.leaderboard is not None:
+                for user, amt in grants:
+                    self.leaderboard.add(user, amt)
+
+        try:
+            self.write(job)
+        except RuntimeError:
+            # unloaded while this tick was running
+            self.log_d("XP database closed, dropping grant")
 
-        # Commit XP modifications and clear active users for the next window.
-        thread_db.commit()
+    def compact_history(self, db: sqlite3.Connection, now: int):
+        """Roll expired raw grants into hourly totals, expired hourly totals into daily totals,
+        and delete expired daily totals.
 
-        self.active_users.clear()
+        :param db: The writer connection
+        :param now: The current timestamp
+        """
+        raw_cutoff = now - self.cfg_get("xp_history_raw_minutes") * 60
+        db.execute(
+            """
+            INSERT INTO xp_hourly (bucket, user, amt)
+            SELECT ts - ts % 3600, user, SUM(amt) FROM xp_log WHERE ts < ? GROUP BY 1, 2
+            ON CONFLICT (bucket, user) DO UPDATE SET amt = amt + excluded.amt
+            """,
+            (raw_cutoff,),
+        )
+        db.execute("DELETE FROM xp_log WHERE ts < ?", (raw_cutoff,))
+
+        hourly_cutoff = now - self.cfg_get("xp_history_hourly_days") * 86400
+        hourly_cutoff -= hourly_cutoff % 86400
+        db.execute(
+            """
+            INSERT INTO xp_daily (bucket, user, amt)
+            SELECT bucket - bucket % 86400, user, SUM(amt) FROM xp_hourly WHERE bucket < ? GROUP BY 1, 2
+            ON CONFLICT (bucket, user) DO UPDATE SET amt = amt + excluded.amt
+            """,
+            (hourly_cutoff,),
+        )
+        db.execute("DELETE FROM xp_hourly WHERE bucket < ?", (hourly_cutoff,))
+
+        daily_cutoff = now - self.cfg_get("xp_history_daily_days") * 86400
+        db.execute("DELETE FROM xp_daily WHERE bucket < ?", (daily_cutoff,))
+
+    def get_gained(self, period: str, user: str = None):
+        """Return the top 3 XP earners over `period`, or how much `user` gained over it.
+
+        :param period: "week" for the last 7 days, or "stream" for the current stream
+        :param user: The name of the user, or `None` for the top 3
+        """
+        if period == "stream":
+            started_at = self._bot.stream_handler.started_at
+            if not started_at:
+                return f"{self._bot.channel_name} is not currently live."
+
+            since = started_at.timestamp()
+            label = "this stream"
+
+        else:
+            since = time.time() - 7 * 86400
+            label = "this week"
+
+        since = int(since)
+        if user:
+            if user.startswith("@"):
+                user = user[1:]
+
+            with self.reader() as db:
+                gained = db.execute(
+                    XP_HISTORY_GAINED_SQL + " WHERE user = ?2", (since, user)
+                ).fetchone()[1]
+            return f"{user} has gained {gained or 0} XP {label}."
+
+        # the week window only moves the buckets it covers once an hour
+        key = (self.write_version, since if period == "stream" else since // 3600)
+        cached = self.top_gained.get(period, None)
+        if cached and cached[0] == key:
+            res = cached[1]
+
+        else:
+            with self.reader() as db:
+                res = db.execute(
+                    XP_HISTORY_GAINED_SQL
+                    + " GROUP BY user ORDER BY gained DESC, user LIMIT 3",
+                    (since,),
+                ).fetchall()
+            self.top_gained[period] = (key, res)
+
+        if not res:
+            return f"No XP has been gained {label}."
+        return f"Top XP {label}: " + " | ".join([f"{r[0]}: {r[1]}" for r in res])
 
     def get_top(self, rank: int):
         """Return the top 3 XP holders."""
-        with self.db as db:
-            if rank:
-                user = self.get_user(rank=rank)
-                if user:
-                    return (
-                        f"{user[0]} (#{user[1]}) is level {user[2]} with {user[3]} XP."
-                    )
-                else:
-                    return f"There is no rank #{rank} user."
+        if rank:
+            user = self.get_user(rank=rank)
+            if user:
+                return f"{user[0]} (#{user[1]}) is level {user[2]} with {user[3]} XP."
+            else:
+                return f"There is no rank #{rank} user."
 
-            self.log_d(f"Retrieving top 3 XP holders")
-            cs = db.cursor()
-            cs.execute(f"SELECT user,amt FROM xp ORDER BY amt DESC")
-            res = cs.fetchmany(3)
+        self.log_d(f"Retrieving top 3 XP holders")
+        if self.leaderboard is not None:
+            res = self.leaderboard.top(3)
+        else:
+            with self.reader() as db:
+                res = db.execute(
+                    "SELECT user, amt FROM xp ORDER BY amt DESC, user LIMIT 3"
+                ).fetchall()
 
-            return " | ".join([f"{r[0]}: {r[1]}" for r in res])
+        return " | ".join([f"{r[0]}: {r[1]}" for r in res])
 
     def get_user(self, user: str = None, rank: int = None):
         """Return the user, position, XP, and level.
 
+        Users with equal XP are ranked alphabetically.
+
         :param user: The name of the user
-        :param rank: The rank of the user
-        :return: A list containing [`name`, `rank`, `level`, `xp`]
+        :param rank: The rank of the user. Negative values count from last place.
+        :return: A list containing [`name`, `rank`, `level`, `xp`], or `False` if there is no such user
         """
         self.log_d(f"retrieving user:{user} or rank:{rank}")
 
-        with self.db as db:
-            cs = db.cursor()
+        if user and user.startswith("@"):
+            user = user[1:]
 
-            # Getting their position
-            all = tuple(
-                map(
-                    lambda x: x,
-                    cs.execute("SELECT user, amt FROM xp ORDER BY amt DESC").fetchall(),
-                )
+        if self.leaderboard is not None:
+            found = self.lookup_memory(user, rank)
+        else:
+            found = self.lookup_sql(user, rank)
+
+        if not found:
+            return False
+        username, index, xp = found
+
+        return (username, index + 1, self.get_level(xp), xp)
+
+    def build_level_thresholds(self):
+        """Rebuild the table of XP thresholds for each level from the config.
+
+        `self.level_thresholds[n]` is the XP a user must exceed to reach level `n + 2`.
+        """
+        self.level_thresholds = [self.cfg_get("level_requirement")]
+        self.level_increment = self.cfg_get("level_increment")
+
+        if self.level_increment <= 1:
+            self.log_e(
+                f"config error: level_increment must be greater than 1, levels will stop at 2"
             )
+
+    def extend_level_thresholds(self, xp: int):
+        """Extend `self.level_thresholds` until it covers `xp`."""
+        if self.level_increment <= 1 or xp <= self.level_thresholds[-1]:
+            return
+
+        thresholds = list(self.level_thresholds)
+        while xp > thresholds[-1]:
+            thresholds.append(thresholds[-1] * self.level_increment)
+
+        # swap in the whole table at once so readers on other threads never see it half-built
+        self.level_thresholds = thresholds
+
+    def get_level(self, xp: int) -> int:
+        """Return the level for `xp`.
+
+        :param xp: The amount of XP
+        :return: The level reached with `xp`
+        """
+        self.extend_level_thresholds(xp)
+        return bisect_left(self.level_thresholds, xp) + 1
+
+    def get_levels(self, amounts: list) -> list:
+        """Return the level for every amount in `amounts`, extending the threshold table only once.
+
+        :param amounts: The amounts of XP, e.g. a page of the leaderboard
+        :return: The levels, in the same order as `amounts`
+        """
+        if not amounts:
+            return []
+
+        self.extend_level_thresholds(max(amounts))
+        thresholds = self.level_thresholds
+        return [bisect_left(thresholds, xp) + 1 for xp in amounts]
+
+    def reload_config(self):
+        BaseModule.reload_config(self)
+        self.build_level_thresholds()
+
+    def cfg_set(self, key: str, value):
+        BaseModule.cfg_set(self, key, value)
+        if key in ["level_requirement", "level_increment"]:
+            self.build_level_thresholds()
+
+    def lookup_memory(self, user: str = None, rank: int = None) -> tuple | None:
+        """Resolve a user or rank using the in-memory leaderboard.
+
+        :return: `(name, index, xp)`, or `None` if there is no such user
+        """
+        if user:
+            index = self.leaderboard.rank(user)
+            if index is None:
+                return None
+            return (user, index, self.leaderboard.get(user))
+
+        # to allow negative indices, show last place, etc.
+        index = rank
+        if rank > 0:
+            index -= 1
+        elif rank < 0:
+            index += len(self.leaderboard)
+
+        found = self.leaderboard.at(index)
+        if not found:
+            return None
+        return (found[0], index, found[1])
+
+    def lookup_sql(self, user: str = None, rank: int = None) -> tuple | None:
+        """Resolve a user or rank using indexed SQLite queries.
+
+        :return: `(name, index, xp)`, or `None` if there is no such user
+        """
+        with self.reader() as db:
             if user:
-                if user.startswith("@"):
-                    user = user[1:]
+                row = db.execute(
+                    "SELECT user, amt FROM xp WHERE user = ?", (user,)
+                ).fetchone()
+
+                if not row:
+                    return None
+
+                # Getting their position: everyone with more XP, or equal XP and an earlier name
+                username, xp = row
+                index = db.execute(
+                    "SELECT (SELECT COUNT(*) FROM xp WHERE amt > ?1)"
+                    + " + (SELECT COUNT(*) FROM xp WHERE amt = ?1 AND user < ?2)",
+                    (xp, username),
+                ).fetchone()[0]
+
+                return (username, index, xp)
+
+            # to allow negative indices, show last place, etc.
+            index = rank
+            if rank > 0:
+                index -= 1
+            elif rank < 0:
+                index += db.execute("SELECT COUNT(*) FROM xp").fetchone()[0]
+
+            if index < 0:
+                return None
+
+            row = db.execute(
+                "SELECT user, amt FROM xp ORDER BY amt DESC, user LIMIT 1 OFFSET ?",
+                (index,),
+            ).fetchone()
+            if not row:
+                return None
+
+            return (row[0], index, row[1])
+
+    def sync_leaderboard(self, db: sqlite3.Connection, users: list):
+        """Copy the stored XP of `users` from `db` into the in-memory leaderboard, if enabled."""
+        if self.leaderboard is None:
+            return
 
-                all_names = [i[0] for i in all]
+        for user in users:
+            row = db.execute("SELECT amt FROM xp WHERE user = ?", (user,)).fetchone()
+            if row:
+                self.leaderboard.set(user, row[0])
+            else:
+                self.leaderboard.remove(user)
+
+    def resolve_transfer_path(self, filename: str) -> str | None:
+        """Resolve `filename` to a path in this channel's XP export folder.
+
+        :return: The path, or `None` if `filename` is not a plain file name in a supported format.
+        """
+        if (
+            os.path.basename(filename) != filename
+            or os.path.splitext(filename)[1] not in XP_TRANSFER_FORMATS
+        ):
+            return None
+
+        folder = f"{BASE_CONFIG_PATH}/{self._bot.channel_id}/modules/xp_exports"
+        if not os.path.exists(folder):
+            os.mkdir(folder)
 
-                # Return false if they don't exist.
-                if user not in all_names:
-                    return False
+        return f"{folder}/{filename}"
 
-                rank = all_names.index(user)
+    def export_xp(self, path: str) -> int:
+        """Stream every user's XP to `path` as CSV or JSONL.
 
+        Reads from a snapshot taken with the SQLite online backup API, so ticks are never blocked.
+
+        :return: The amount of users exported.
+        """
+        snapshot_path = f"{path}.snapshot"
+        snapshot = sqlite3.connect(snapshot_path)
+        try:
+            with self.reader() as db:
+                db.backup(snapshot, pages=1024)
+
+            exported = 0
+            rows = snapshot.execute("SELECT user, amt FROM xp ORDER BY amt DESC, user")
+            with open(path, "w", newline="", encoding="utf-8") as file:
+                if path.endswith(".csv"):
+                    writer = csv.writer(file)
+                    writer.writerow(["user", "amt", "level"])
+
+                while chunk := rows.fetchmany(XP_TRANSFER_CHUNK_SIZE):
+                    levels = self.get_levels([amt for _, amt in chunk])
+
+                    if path.endswith(".csv"):
+                        writer.writerows(
+                            (user, amt, level)
+                            for (user, amt), level in zip(chunk, levels)
+                        )
+                    else:
+                        file.writelines(
+                            json.dumps({"user": user, "amt": amt, "level": level})
+                            + "\n"
+                            for (user, amt), level in zip(chunk, levels)
+                        )
+
+                    exported += len(chunk)
+
+        finally:
+            snapshot.close()
+            os.remove(snapshot_path)
+
+        return exported
+
+    def import_xp(self, path: str, replace: bool = False) -> int:
+        """Stream users' XP from a CSV or JSONL file at `path` into the database in chunks.
+
+        :param replace: Whether to overwrite the XP of users already tracked, instead of adding to it.
+        :return: The amount of users imported.
+        """
+        if replace:
+            sql = """
+            INSERT INTO xp (user, amt) VALUES (?, ?)
+            ON CONFLICT (user) DO UPDATE SET amt = excluded.amt
+            """
+        else:
+            sql = XP_GRANT_SQL
+
+        def write_chunk(chunk: list):
+            def job(db: sqlite3.Connection):
+                db.executemany(sql, chunk)
+                db.commit()
+
+                if self.leaderboard is not None:
+                    for user, amt in chunk:
+                        if replace:
+                            self.leaderboard.set(user, amt)
+                        else:
+                            self.leaderboard.add(user, amt)
+
+            self.write(job)
+
+        imported = 0
+        chunk = []
+        with open(path, "r", newline="", encoding="utf-8") as file:
+            if path.endswith(".csv"):
+                rows = ((r["user"], r["amt"]) for r in csv.DictReader(file))
             else:
-                if rank > len(all):
-                    raise ValueError
+                rows = ((r["user"], r["amt"]) for r in map(json.loads, file) if r)
 
-                # to allow negative indices, show last place, etc.
-                if rank > 0:
-                    rank -= 1
+            for user, amt in rows:
+                chunk.append((str(user).lower(), int(amt)))
 
-            user = all[rank]
-            username = user[0]
-            xp = user[1]
+                if len(chunk) >= XP_TRANSFER_CHUNK_SIZE:
+                    write_chunk(chunk)
+                    imported += len(chunk)
+                    chunk = []
 
-        next_lv_req = self.cfg_get("level_requirement")
-        level = 1
-        while xp > next_lv_req:
-            level += 1
-            next_lv_req = next_lv_req * self.cfg_get("level_increment")
+        if chunk:
+            write_chunk(chunk)
+            imported += len(chunk)
 
-        return (username, rank + 1, level, xp)
+        return imported
 
-    def mod_user(self, args):
-        """Perform an action on a user."""
-        # TODO: refactor this. it's bad.
+    def transfer_file(self, action: str, filename: str, mode: str = None):
+        """Run `export_xp` or `import_xp` in the background and report the result in chat."""
+        path = self.resolve_transfer_path(filename)
+        if not path:
+            return f"Please provide a file name ending in {' or '.join(XP_TRANSFER_FORMATS)}."
+
+        if action == "import" and not os.path.exists(path):
+            return f"No file named {filename} to import."
+
+        replace = mode == "replace"
 
-        actions = ["set", "transfer", "ban", "unban"]
-        msg = f"Please provide a valid action and a user. Valid actions include: {', '.join(actions)}."
+        def run():
+            try:
+                if action == "export":
+                    count = self.export_xp(path)
+                    self._bot.send_message(f"Exported XP for {count} users to {filename}.")
+                else:
+                    count = self.import_xp(path, replace)
+                    self._bot.send_message(
+                        f"Imported XP for {count} users from {filename}."
+                    )
+
+            except (OSError, ValueError, KeyError, sqlite3.Error) as err:
+                self.log_e(f"XP {action} of {filename} failed: {err}")
+                self._bot.send_message(f"XP {action} of {filename} failed: {err}")
+
+        threading.Thread(target=run, daemon=True).start()
+        return f"Started XP {action} {'to' if action == 'export' else 'from'} {filename}."
+
+    def reload_leaderboard(self, db: sqlite3.Connection):
+        """Rebuild the in-memory leaderboard from `db`, if enabled. Used after bulk actions."""
+        if self.leaderboard is None:
+            return
+
+        self.leaderboard = Leaderboard.from_rows(
+            db.execute("SELECT user, amt FROM xp ORDER BY amt DESC, user")
+        )
+
+    def mod_all(self, action: str, args: list):
+        """Perform an action on every user at once, in a single statement."""
+        try:
+            value = float(args[0]) if action == "decay" else int(args[0])
+        except (ValueError, IndexError):
+            value = None
+
+        if action == "grantall":
+            if value is None or value < 1:
+                return "Please provide a positive amount of XP to grant to every chatter."
+
+            omit_users = set(self.cfg_get("omit_users"))
+            users = self._bot.presence_handler.snapshot()
+            self.grant([(user, value) for user in users if user not in omit_users])
+            return f"Granted {value} XP to {len(users - omit_users)} chatters."
+
+        if action == "decay":
+            if value is None or not 0 < value <= 100:
+                return "Please provide a percentage between 0 and 100 to decay everyone's XP by."
+
+            def perform(db: sqlite3.Connection):
+                db.execute(
+                    "UPDATE xp SET amt = amt - CAST(amt * ? / 100.0 AS INTEGER) WHERE amt > 0",
+                    (value,),
+                )
+                db.commit()
+                self.reload_leaderboard(db)
+
+            self.write(perform)
+            return f"Decayed everyone's XP by {value:g}%."
+
+        if action == "resetbelow":
+            if value is None:
+                return "Please provide an amount of XP to reset users below."
+
+            def perform(db: sqlite3.Connection):
+                count = db.execute(
+                    "UPDATE xp SET amt = 0 WHERE amt < ? AND amt != 0", (value,)
+                ).rowcount
+                db.commit()
+                self.reload_leaderboard(db)
+                return count
+
+            count = self.write(perform)
+            return f"Reset XP of {count} users with less than {value} XP."
+
+    def mod_user(self, args):
+        """Perform an action on a user, or on every user at once."""
+        actions = ["set", "transfer", "ban", "unban", "export", "import"]
+        bulk_actions = ["grantall", "decay", "resetbelow"]
+        msg = f"Please provide a valid action and a user. Valid actions include: {', '.join(actions + bulk_actions)}."
 
         if not args:
             return msg
 
         action = args[0]
 
+        # whole-leaderboard actions take a file name or amount rather than a user
+        if action == "export":
+            filename = args[1] if len(args) > 1 else f"xp-{int(time.time())}.csv"
+            return self.transfer_file(action, filename)
+
+        if action == "import":
+            if len(args) < 2:
+                return "Please provide a file to import, and optionally 'replace' to overwrite existing XP instead of adding to it."
+
+            return self.transfer_file(action, args[1], args[2] if len(args) > 2 else None)
+
+        if action in bulk_actions:
+            self.log_d(f"running XPMod bulk action {action} {args}")
+            return self.mod_all(action, args[1:])
+
         if len(args) < 2 or (action not in actions):
             return msg
 
@@ -187,7 +1000,9 @@ class Module(BaseModule):
             user = user[1:]
 
         self.log_d(f"running XPMod action {action} {args} on {user}")
-        with self.db as db:
+
+        def perform(db: sqlite3.Connection):
+            changed = []
             if action == "set":
                 # verify needed args exist
                 try:
@@ -196,44 +1011,40 @@ class Module(BaseModule):
                     return "Please provide a number to set the user's XP to."
 
                 # perform update
-                db.execute(f'UPDATE xp SET amt = {amt} WHERE user = "{user}"')
+                db.execute("UPDATE xp SET amt = ? WHERE user = ?", (amt, user))
                 msg = f"Set {user}'s XP to {amt}."
+                changed = [user]
 
             elif action == "transfer":
                 # verify needed args exist
                 try:
                     target = args[2]
                     amount = int(args[3])
+                    if amount < 0:
+                        raise ValueError
                 except (ValueError, IndexError):
                     return "Please provide a user to transfer the first user's points to, and how many."
 
-                # resolve users and amounts
-                src = self.get_user(user=user)
-                if not src:
-                    return f"User {user} has no tracked XP."
-                tar = self.get_user(user=target)
-                if not tar:
-                    if target.startswith("@"):
-                        target = target[1:]
-
-                    tar = (target, 0, 0)
+                if target.startswith("@"):
+                    target = target[1:]
 
-                    db.execute("INSERT OR IGNORE INTO xp VALUES(?,?)", (target, 0))
+                # resolve the source's amount
+                row = db.execute(
+                    "SELECT amt FROM xp WHERE user = ?", (user,)
+                ).fetchone()
+                if not row:
+                    return f"User {user} has no tracked XP."
 
                 # ensure we don't grant more than the user can afford
-                d = src[2] - amount
-                if d < 0:
-                    s_amt = 0
-                    t_amt = tar[2] + src[2]
-                    amount = src[2]
-                else:
-                    s_amt = d
-                    t_amt = tar[2] + amount
+                amount = min(amount, row[0])
 
                 # perform updates
-                db.execute(f'UPDATE xp SET amt = {s_amt} WHERE user = "{src[0]}"')
-                db.execute(f'UPDATE xp SET amt = {t_amt} WHERE user = "{tar[0]}"')
-                msg = f"Transferred {amount} points from {user} to {tar[0]}."
+                db.execute(
+                    "UPDATE xp SET amt = amt - ? WHERE user = ?", (amount, user)
+                )
+                db.execute(XP_GRANT_SQL, (target, amount))
+                msg = f"Transferred {amount} points from {user} to {target}."
+                changed = [user, target]
 
             elif action == "ban":
                 omit_users = self.cfg_get("omit_users")
@@ -241,13 +1052,16 @@ class Module(BaseModule):
                     return f"User {user} is already banned from XP."
 
                 # create the user if they don't already exist
-                db.execute("INSERT OR IGNORE INTO xp VALUES(?,?)", (user, 0))
-                db.execute(f'UPDATE xp SET amt = 0 WHERE user = "{user}"')
+                db.execute(
+                    "INSERT INTO xp (user, amt) VALUES (?, 0) ON CONFLICT (user) DO UPDATE SET amt = 0",
+                    (user,),
+                )
 
                 omit_users.append(user)
                 self.cfg_set("omit_users", omit_users)
 
                 msg = f"Set {user}'s XP to 0 and banished from earning."
+                changed = [user]
 
             elif action == "unban":
                 omit_users = self.cfg_get("omit_users")
@@ -260,7 +1074,10 @@ class Module(BaseModule):
                 msg = f"Removed {user} from XP banished users."
 
             db.commit()
-        return msg
+            self.sync_leaderboard(db, changed)
+            return msg
+
+        return self.write(perform)
 
     def main(self, message: Message):
         args = self.get_args_lower(message)
@@ -281,6 +1098,13 @@ class Module(BaseModule):
 
             return self.get_top(rank)
 
+        # Show top 3 or a user's XP gained this week or stream
+        if arg in ["week", "stream"]:
+            if not self.cfg_get("xp_history"):
+                return "XP history is not enabled."
+
+            return self.get_gained(arg, args.pop(0) if args else None)
+
         # XP moderation tools
         if arg == "mod":
             if not message.author.priv >= Author.Privilege.MOD:
@@ -295,7 +1119,7 @@ class Module(BaseModule):
             return f"{arg} has no tracked XP."
 
     def on_pubmsg(self, message: Message):
-        return
-        # Add this user to the active users list.
-        if not message.author.name in self.active_users:
-            self.active_users.append(message.author.name.lower())
+        # Count this message towards the user's activity in the current window.
+        user = message.author.name.lower()
+        with self.active_users_lock:
+            self.active_users[user] = self.active_users.get(user, 0) + 1
@@ -1,6 +1,7 @@
 import logging
-from requests import get, post
+import requests
 import socket
+import threading
 import time
 import webbrowser
 
@@ -8,7 +9,13 @@ from src.config import ConfigHandler, BASE_CONFIG_PATH
 from src.definitions import Singleton
 
 
-class OAuth2Handler(Singleton):
+class OAuth2Handler(metaclass=Singleton):
+    """Base OAuth2 session handler.
+
+    Handlers are shared process-wide per config path: constructing one for a path that
+    already has a handler returns the existing handler instead of re-reading its config.
+    """
+
     name = ""
     """Discriminator for this OAuth2Handler."""
     default_config = {
@@ -27,11 +34,15 @@ class OAuth2Handler(Singleton):
     api = ""
     """Base URL of the API."""
 
-    def __init__(self, cfgpath: int):
+    def __init__(self, cfgpath: str):
         """Create a new `OAuthV2Handler`.
 
         :param cfgpath: The path to save/load APIv2 Config for.
         """
+        self._token_lock = threading.RLock()
+
+        # pooled connections, shared by everything using this handler
+        self._session = requests.Session()
         self.cfg_handler = ConfigHandler(
             f"{BASE_CONFIG_PATH}/{cfgpath}", self.default_config
         )
@@ -157,7 +168,7 @@ class OAuth2Handler(Singleton):
             "Accept": "application/json",
             "Content-Type": "application/json",
         }
-        token = post(self.oauth_token_uri, headers=headers, json=data)
+        token = self._session.post(self.oauth_token_uri, headers=headers, json=data)
 
         if not token.status_code == 200:
             logging.error(f"'{self.name}' OAuth token grab failed! ({token.json()})")
@@ -168,24 +179,27 @@ class OAuth2Handler(Singleton):
         self.__save()
         return True
 
-    def __request(self, method, endpoint: str, data: dict = None):
+    def __request(self, method, endpoint: str, data: dict = None, api: str = None):
         """Send a request to an endpoint of `self.api`.
 
         Returns `False` if the request was unsuccessful (e.g. 401, 404).
 
-        :param method: `requests` method to use.
+        :param method: HTTP method to use, e.g. "GET".
         :param endpoint: Endpoint relative to `self.api` to call.
         :param data: The json data to send in the request, frequently used in POST requests.
+        :param api: Base URL to use instead of `self.api`, e.g. for a local mock server.
 
         :return: The json data of the response, or `False` if unsuccessful.
         """
         if not self.token:
             return False
 
-        if time.time() >= self.token.get("expiry", 0):
-            self.__refresh_token()
+        # only one thread refreshes an expired token; the rest wait and use the new one
+        with self._token_lock:
+            if time.time() >= self.token.get("expiry", 0):
+                self.__refresh_token()
 
-        url = self.api + endpoint
+        url = (api or self.api) + endpoint
 
         headers = {
             "Authorization": f"{str.capitalize(self.token['token_type'])} {self.token['access_token']}",
@@ -195,9 +209,9 @@ class OAuth2Handler(Singleton):
         }
 
         if data:
-            response = method(url, headers=headers, json=data)
+            response = self._session.request(method, url, headers=headers, json=data)
         else:
-            response = method(url, headers=headers)
+            response = self._session.request(method, url, headers=headers)
 
         logging.debug(response.status_code)
         logging.debug(response.json())
@@ -217,20 +231,23 @@ class OAuth2Handler(Singleton):
         :return: The json data of the response, or `False` if unsuccessful.
         """
         if data:
-            return self.__request(get, endpoint, data)
-        return self.__request(get, endpoint)
+            return self.__request("GET", endpoint, data)
+        return self.__request("GET", endpoint)
 
-    def _post(self, endpoint: str = None, data: dict = None) -> bool | dict:
+    def _post(
+        self, endpoint: str = None, data: dict = None, api: str = None
+    ) -> bool | dict:
         """Send a POST request to `endpoint` of `self.api`.
 
         Returns `False` if unsuccessful.
 
         :param endpoint: Endpoint relative to `self.api` to call.
         :param data: The json data to send in the POST.
+        :param api: Base URL to use instead of `self.api`.
 
         :return: The json data of the response, or `False` if unsuccessful.
         """
-        return self.__request(post, endpoint, data)
+        return self.__request("POST", endpoint, data, api)
 
 
 class TwitchOAuth2Helper(OAuth2Handler):
@@ -242,7 +259,11 @@ class TwitchOAuth2Helper(OAuth2Handler):
         "irc_oauth": None,
     }
     callback_port = None
-    scopes = ["moderator:read:chatters"]
+    scopes = [
+        "moderator:read:chatters",
+        "moderator:read:followers",
+        "channel:read:redemptions",
+    ]
     oauth_grant_uri = "https://id.twitch.tv/oauth2/authorize"
     oauth_token_uri = "https://id.twitch.tv/oauth2/token"
     api = "https://api.twitch.tv/helix"
@@ -300,6 +321,17 @@ class TwitchOAuth2Helper(OAuth2Handler):
 
         return True
 
+    def missing_scopes(self, scopes: list) -> list:
+        """Return which of `scopes` the current token was not granted.
+
+        Tokens are only granted the scopes in `self.scopes` at the time they were authorized,
+        so tokens from before a scope was added lack it until re-authorized.
+
+        :param scopes: The scopes to check for.
+        """
+        granted = (self.token or {}).get("scope") or []
+        return [scope for scope in scopes if scope not in granted]
+
     def get_stream(self, user_id: int = None, user_login: str = None) -> bool | dict:
         """Return the stream information for `user_id` or `user_login`.
 
@@ -398,3 +430,38 @@ class TwitchOAuth2Helper(OAuth2Handler):
         results += [[user["user_id"], user["user_login"]] for user in query["data"]]
 
         return results
+
+    def create_eventsub_subscription(
+        self,
+        type: str,
+        version: str,
+        condition: dict,
+        session_id: str,
+        api: str = None,
+    ) -> bool:
+        """Subscribe an EventSub WebSocket session to an event type.
+
+        :param type: The subscription type, e.g. `stream.online`.
+        :param version: The version of the subscription type.
+        :param condition: The condition of the subscription, e.g. `{"broadcaster_user_id": "1234"}`.
+        :param session_id: The ID of the EventSub WebSocket session to deliver events to.
+        :param api: Base URL to create the subscription at instead of `self.api`, e.g. a local mock server.
+
+        :return: Whether the subscription was created.
+        """
+        query = self._post(
+            "/eventsub/subscriptions",
+            {
+                "type": type,
+                "version": version,
+                "condition": condition,
+                "transport": {"method": "websocket", "session_id": session_id},
+            },
+            api,
+        )
+
+        if not query or "data" not in query:
+            logging.warning(f"failed to subscribe to EventSub {type}: {query}")
+            return False
+
+        return True
@@ -1,12 +1,16 @@
 import irc.bot
 import logging
 from threading import Timer
+import time
 import traceback
 
 from src.commands import CommandsHandler
 from src.plugins import ModulesHandler
-from src.config import ConfigHandler, DEFAULT_CHANNEL
+from src.config import ConfigHandler, DEFAULT_CHANNEL, read_global
+from src.eventsub import EventSubHandler
+from src.presence import PresenceHandler
 from src.authentication import TwitchOAuth2Helper
+from src.stream import StreamStateHandler
 from src.definitions import Author, Message, status_from_user_privilege
 
 class TwitchBot(irc.bot.SingleServerIRCBot):
@@ -16,16 +20,24 @@ class TwitchBot(irc.bot.SingleServerIRCBot):
     channel: str
     commands_handler: CommandsHandler
     modules_handler: ModulesHandler
+    stream_handler: StreamStateHandler
+    presence_handler: PresenceHandler
+    eventsub_handler: EventSubHandler | None
+    """EventSub connection delivering stream and channel events, or `None` if disabled."""
     cfgpath: str
     """Path to the currently used channel config file."""
     prefix: str
     always_import_list: list
     """List of modules to always import, regardless of whether they're used in commands."""
+    suggest_commands: bool
+    """Whether to suggest similar commands when an unknown command is called."""
 
     CONNECTION_ATTEMPT_LIMIT = 3
     """Maximum number of connection attempts before giving up."""
     CONNECTION_ATTEMPT_TIMER = 5
     """Time between connection attempts, in seconds."""
+    SUGGESTION_COOLDOWN = 30
+    """Time before looking up a suggestion for the same user again, in seconds."""
 
     def __init__(
         self, auth: TwitchOAuth2Helper, channel_name: str, channel_id: int = None
@@ -37,6 +49,7 @@ class TwitchBot(irc.bot.SingleServerIRCBot):
         """
         self.__joined = False
         self.__connection_tries = 0
+        self.__suggested = {}
 
         # Grab channels
         self.channel_name = channel_name
@@ -55,11 +68,24 @@ class TwitchBot(irc.bot.SingleServerIRCBot):
         if channel_name != self.auth.user_id:
             self.user_id = self.auth.get_user_id(self.auth.user_id)
 
+        # Track stream state for the lifetime of the bot, across config reloads
+        self.stream_handler = StreamStateHandler(self)
+        self.presence_handler = PresenceHandler(self)
+
         self.cfg_handler = ConfigHandler(
             f"{self.channel_id}/config.txt", DEFAULT_CHANNEL
         )
         self.reload()
 
+        # Receive stream and channel events as they happen instead of polling for them
+        self.eventsub_handler = None
+        cfg_global = read_global()
+        if cfg_global["eventsub"]:
+            self.eventsub_handler = EventSubHandler(
+                self, cfg_global["eventsub_url"], cfg_global["eventsub_api"]
+            )
+            self.eventsub_handler.start()
+
         self.attempt_connect()
 
     def attempt_connect(self):
@@ -96,8 +122,10 @@ class TwitchBot(irc.bot.SingleServerIRCBot):
         self.prefix = cfg["meta"]["prefix"]
         logging.info(f"Prefix set as '{self.prefix}'")
 
+        self.suggest_commands = cfg["meta"].get("suggest_commands", False)
+
         # Instantiate handler modules
-        self.commands_handler = CommandsHandler(self)
+        self.commands_handler = CommandsHandler(self, self.suggest_commands)
         self.modules_handler = ModulesHandler(self)
 
         # Import commands from config
@@ -114,6 +142,13 @@ class TwitchBot(irc.bot.SingleServerIRCBot):
 
         logging.info(f"Imported {len(cfg['commands'])} command(s)")
 
+        # Import aliases from config
+        for alias, name in cfg["aliases"].items():
+            try:
+                self.commands_handler.add_alias(alias, name)
+            except ValueError as err:
+                logging.error(f"alias '{alias}' is invalid ({err}): ignoring...")
+
         # Import additional modules
         self.always_import_list = cfg["modules"]
         if cfg["modules"]:
@@ -134,13 +169,19 @@ class TwitchBot(irc.bot.SingleServerIRCBot):
         """Write this bots' config file. For easy use within modules."""
         # Construct skeleton
         data = {
-            "meta": {"prefix": self.prefix},
+            "meta": {
+                "prefix": self.prefix,
+                "suggest_commands": self.suggest_commands,
+            },
             "commands": {},
+            "aliases": dict(self.commands_handler.aliases),
             "modules": self.always_import_list,
         }
 
         # Adding commands
         for name, command in self.commands_handler.commands.items():
+            if name in self.commands_handler.aliases:
+                continue
             data["commands"][name] = command.jsonify()
 
         self.cfg_handler.write(data)
@@ -151,6 +192,11 @@ class TwitchBot(irc.bot.SingleServerIRCBot):
         for module in modules:
             self.modules_handler.delete(module)
 
+        if self.eventsub_handler:
+            self.eventsub_handler.__del__()
+        self.stream_handler.__del__()
+        self.presence_handler.__del__()
+
         del self
 
     def on_welcome(self, c, e):
@@ -163,6 +209,21 @@ class TwitchBot(irc.bot.SingleServerIRCBot):
         self.__joined = True
         logging.info(f"Joined {self.channel}! ({self.channel_id})\n")
 
+    def on_join(self, c, e):
+        self.presence_handler.join(e.source.nick)
+
+    def on_part(self, c, e):
+        self.presence_handler.part(e.source.nick)
+
+    def on_namreply(self, c, e):
+        for name in e.arguments[-1].split():
+            self.presence_handler.join(name)
+
+    def on_endofnames(self, c, e):
+        # NAMES only lists moderators in large channels, and anyone who left while
+        # we were disconnected is still tracked, so correct the set against Helix
+        self.presence_handler.reconcile_async()
+
     def on_pubmsg(self, c, e):
         """Code to be run when a message is sent."""
         # Recomprehend tags into something usable
@@ -184,6 +245,7 @@ class TwitchBot(irc.bot.SingleServerIRCBot):
 
         # Create author object
         author = Author(name, display_name, uid, ismod, issub, isvip, ishost)
+        self.presence_handler.join(name)
 
         # Create message object
         msg: str = e.arguments[0].replace(" \U000e0000", "")
@@ -209,6 +271,12 @@ class TwitchBot(irc.bot.SingleServerIRCBot):
                 logging.debug(
                     f"Ignoring invalid command call '{cmd}' from {name} ({status_from_user_privilege(author.priv)})"
                 )
+
+                suggestion = self.suggest_command(cmd, author)
+                if suggestion:
+                    self.send_message(
+                        f"@{name} > Unknown command. Did you mean {self.prefix}{suggestion}?"
+                    )
                 return
 
             # Run the command and string result message
@@ -229,6 +297,31 @@ class TwitchBot(irc.bot.SingleServerIRCBot):
             err_str = traceback.format_exc()
             logging.error(err_str)
 
+    def suggest_command(self, cmd: str, author: Author) -> str | None:
+        """Return a similar command to suggest for unknown command `cmd`.
+        Looks up at most once every `SUGGESTION_COOLDOWN` seconds per user, whether or not anything is found.
+
+        :param cmd: The unknown command name.
+        :param author: The author who called it.
+        """
+        if not self.suggest_commands:
+            return None
+
+        now = time.time()
+        if now - self.__suggested.get(author.uid, 0) < self.SUGGESTION_COOLDOWN:
+            return None
+
+        # forget users whose cooldown has passed before tracking another
+        if len(self.__suggested) > 1000:
+            self.__suggested = {
+                uid: used
+                for uid, used in self.__suggested.items()
+                if now - used < self.SUGGESTION_COOLDOWN
+            }
+        self.__suggested[author.uid] = now
+
+        return self.commands_handler.suggest(cmd, author)
+
     def send_message(self, msg: str):
         """Sends a message to the public chat. For easy use within modules.
 
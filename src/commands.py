@@ -7,6 +7,107 @@ from src.definitions import Author, Message, NO_MESSAGE_SIGNAL
 MODULE_MENTION_RE = re.compile(r"(%([\/a-z0-9_]+)%)")
 """Regex to search command responses with to apply modules."""
 
+SUGGESTION_MAX_DISTANCE = 2
+"""Maximum edit distance of a command name from an unknown command to suggest it."""
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Return the Levenshtein distance between `a` and `b`."""
+    if len(a) < len(b):
+        a, b = b, a
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        previous = current
+
+    return previous[-1]
+
+
+def deletion_variants(word: str, amount: int) -> set:
+    """Return every string made by deleting up to `amount` characters from `word`, including `word`."""
+    variants = {word}
+    frontier = {word}
+    for _ in range(amount):
+        frontier = {v[:i] + v[i + 1 :] for v in frontier for i in range(len(v))}
+        variants |= frontier
+
+    return variants
+
+
+class CommandIndex:
+    """Index of command names for finding near misses of an unknown command.
+
+    Maps every variant of each name with up to `max_distance` characters deleted to the names producing it.
+    Any two names within `max_distance` edits share such a variant, so a search only measures
+    the distance to names sharing a variant with the query instead of to every name.
+    """
+
+    def __init__(self, max_distance: int = SUGGESTION_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.variants: dict[str, set] = {}
+        self.lengths: dict[int, int] = {}
+        """Amount of indexed names of each length, to know the longest."""
+
+    def add(self, name: str):
+        if name in self.variants.get(name, ()):
+            return
+
+        for variant in deletion_variants(name, self.max_distance):
+            self.variants.setdefault(variant, set()).add(name)
+        self.lengths[len(name)] = self.lengths.get(len(name), 0) + 1
+
+    def remove(self, name: str):
+        if name not in self.variants.get(name, ()):
+            return
+
+        self.lengths[len(name)] -= 1
+        if not self.lengths[len(name)]:
+            del self.lengths[len(name)]
+
+        for variant in deletion_variants(name, self.max_distance):
+            names = self.variants.get(variant)
+            if names is None:
+                continue
+
+            names.discard(name)
+            if not names:
+                del self.variants[variant]
+
+    def search(self, word: str) -> list:
+        """Return the names within `max_distance` edits of `word`, closest first.
+
+        Allows at most one edit per two characters of `word`, so short typos don't match everything.
+
+        :return: A list of `(distance, name)`.
+        """
+        limit = min(self.max_distance, len(word) // 2)
+
+        # nothing can be close to a word much longer than every name,
+        # and generating its variants costs quadratically in its length
+        if not self.lengths or len(word) > max(self.lengths) + limit:
+            return []
+
+        candidates = set()
+        for variant in deletion_variants(word, limit):
+            candidates |= self.variants.get(variant, set())
+
+        matches = []
+        for name in candidates:
+            distance = edit_distance(word, name)
+            if distance <= limit:
+                matches.append((distance, name))
+
+        return sorted(matches)
+
 
 class Command:
     name: str
@@ -62,11 +163,25 @@ class Command:
 
 class CommandsHandler:
     commands: dict[str, Command]
-    """List of available commands."""
-
-    def __init__(self, bot):
+    """List of available commands. Aliases map to the same `Command` as the command they refer to."""
+    aliases: dict[str, str]
+    """Map of alias to the name of the command it refers to."""
+    version: int
+    """Incremented on every change to `commands`, so anything derived from them can be cached."""
+    index: CommandIndex | None
+    """Index of command names for suggestions, or `None` if suggestions are disabled."""
+
+    def __init__(self, bot, suggest: bool = False):
+        """Create a new `CommandsHandler`.
+
+        :param bot: The `TwitchBot` this handles the commands of.
+        :param suggest: Whether to index command names for suggesting them on unknown commands.
+        """
         self.bot = bot
         self.commands = {}
+        self.aliases = {}
+        self.version = 0
+        self.index = CommandIndex() if suggest else None
 
     def get(self, name: str) -> Command | None:
         return self.commands.get(name, None)
@@ -92,7 +207,19 @@ class CommandsHandler:
                 except ModuleNotFoundError as err:
                     raise err
 
+        # a new command takes the name over from an alias
+        if name in self.aliases:
+            self.remove_alias(name)
+
         self.commands[name] = Command(name, command)
+        self.version += 1
+
+        # keep existing aliases pointing at the replacement
+        for alias in self.get_aliases(name):
+            self.commands[alias] = self.commands[name]
+
+        if self.index is not None:
+            self.index.add(name)
 
     def modify(self, name: str, key: str, value) -> None:
         """Modify `key` for `name`.
@@ -117,13 +244,106 @@ class CommandsHandler:
         else:
             raise ValueError(f"{key} is not a valid field to modify")
 
+        self.version += 1
+
     def delete(self, name: str) -> None:
-        """Delete a command if it exists.
+        """Delete a command and its aliases if it exists, or just the alias if `name` is one.
 
         :param name: The name of the command.
         """
+        if name in self.aliases:
+            self.remove_alias(name)
+            return
+
         logging.debug(f"removing {name}")
+        for alias in self.get_aliases(name):
+            self.remove_alias(alias)
+
         del self.commands[name]
+        self.version += 1
+
+        if self.index is not None:
+            self.index.remove(name)
+
+    def rename(self, name: str, new_name: str) -> None:
+        """Rename a command, keeping its settings, cooldown, and aliases.
+
+        :param name: The name of the command, or an alias of it.
+        :param new_name: The new name of the command. Replaces any command or alias already using it,
+            deleting the replaced command's aliases.
+        """
+        name = self.aliases.get(name, name)
+        if new_name == name:
+            return
+
+        logging.debug(f"renaming {name} to {new_name}")
+        if new_name in self.commands:
+            self.delete(new_name)
+
+        command = self.commands.pop(name)
+        command.name = new_name
+        self.commands[new_name] = command
+        self.version += 1
+
+        for alias in self.get_aliases(name):
+            self.aliases[alias] = new_name
+
+        if self.index is not None:
+            self.index.remove(name)
+            self.index.add(new_name)
+
+    def get_aliases(self, name: str) -> list:
+        """Return every alias of the command `name`."""
+        return [alias for alias, target in self.aliases.items() if target == name]
+
+    def add_alias(self, alias: str, name: str) -> None:
+        """Make `alias` call the command `name`, sharing its settings and cooldown.
+
+        :param alias: The alias to add.
+        :param name: The name of the command, or an alias of it.
+        """
+        name = self.aliases.get(name, name)
+        if name not in self.commands:
+            raise ValueError(f"{name} is not a command")
+        if alias in self.commands and alias not in self.aliases:
+            raise ValueError(f"{alias} is already a command")
+
+        logging.debug(f"aliasing {alias} to {name}")
+        self.aliases[alias] = name
+        self.commands[alias] = self.commands[name]
+        self.version += 1
+
+        if self.index is not None:
+            self.index.add(alias)
+
+    def remove_alias(self, alias: str) -> None:
+        """Remove `alias`, leaving the command it refers to as-is.
+
+        :param alias: The alias to remove.
+        """
+        logging.debug(f"removing alias {alias}")
+        del self.aliases[alias]
+        del self.commands[alias]
+        self.version += 1
+
+        if self.index is not None:
+            self.index.remove(alias)
+
+    def suggest(self, name: str, author: Author) -> str | None:
+        """Return the closest command to `name` that `author` can use, if any are close enough.
+
+        :param name: The unknown command name.
+        :param author: The author to check command privileges against.
+        """
+        if self.index is None:
+            return None
+
+        for _, match in self.index.search(name):
+            command = self.commands[match]
+            if not command.hidden and author.priv >= command.privilege:
+                return match
+
+        return None
 
     def run(self, command: str, message: Message) -> str | None:
         """Code to be run when this command is called from chat.
@@ -38,7 +38,8 @@ DEFAULT_CHANNEL = {
             "response": "@%caller% > %admin%",
         },
     },
-    "meta": {"prefix": "r!"},
+    "aliases": {},
+    "meta": {"prefix": "r!", "suggest_commands": False},
     "modules": [],
 }
 """Default channel config."""
@@ -46,6 +47,9 @@ DEFAULT_CHANNEL = {
 DEFAULT_GLOBAL = {
     "default_authfile": "auth.txt",
     "release_branch": "main",
+    "eventsub": True,
+    "eventsub_url": "wss://eventsub.wss.twitch.tv/ws",
+    "eventsub_api": None,
 }
 
 read_global = lambda: ConfigHandler(GLOBAL_CONFIG_FILE, DEFAULT_GLOBAL).read()
@@ -214,14 +214,34 @@ class Message:
         return ret
 
 
-class Singleton:
-    spaces = {}
-
-    def __new__(cls, *args, **kwargs):
-        name = args[0]
-        if not hasattr(cls.spaces, name):
-            cls.spaces[name] = super(Singleton, cls).__new__(cls)
-        return cls.spaces[name]
+class Singleton(type):
+    """Metaclass giving a class one shared, process-wide instance per first constructor argument.
+
+    Construction is lazy and thread-safe: the first call for a key builds the instance,
+    every later call (from any thread) gets that same instance without running `__init__` again.
+    """
+
+    spaces: dict = {}
+    """Registry of constructed instances, keyed by `(cls, key)`."""
+    _spaces_lock = threading.Lock()
+    _key_locks: dict = {}
+
+    def __call__(cls, key, *args, **kwargs):
+        space = (cls, key)
+
+        instance = Singleton.spaces.get(space, None)
+        if instance is not None:
+            return instance
+
+        # one lock per key so a slow construction (e.g. an interactive OAuth setup)
+        # does not block construction of unrelated instances
+        with Singleton._spaces_lock:
+            key_lock = Singleton._key_locks.setdefault(space, threading.Lock())
+
+        with key_lock:
+            if space not in Singleton.spaces:
+                Singleton.spaces[space] = super().__call__(key, *args, **kwargs)
+            return Singleton.spaces[space]
 
 
 class RepeatTimer(threading.Timer):
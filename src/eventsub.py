@@ -0,0 +1,228 @@
+from collections import deque
+import datetime
+import json
+import logging
+import threading
+import traceback
+
+import websocket
+
+EVENTSUB_URL = "wss://eventsub.wss.twitch.tv/ws"
+"""Twitch EventSub WebSocket endpoint."""
+
+
+class EventSubHandler(threading.Thread):
+    """EventSub WebSocket client delivering channel events to the bot.
+
+    Subscribes to `subscriptions()` on every new session, follows `session_reconnect` messages,
+    and reconnects with backoff when the connection drops or keepalives stop arriving.
+    Stream online/offline events update `bot.stream_handler`; every event is passed to modules' `on_event`.
+    """
+
+    CONNECT_TIMEOUT = 10
+    """Time to wait for a connection and its welcome message, in seconds."""
+    KEEPALIVE_GRACE = 5
+    """Extra time past the session's keepalive timeout to wait for a message before reconnecting, in seconds."""
+    RECONNECT_MIN_WAIT = 1
+    """Time to wait before the first reconnect attempt, in seconds."""
+    RECONNECT_MAX_WAIT = 60
+    """Most time to wait between reconnect attempts, in seconds."""
+    SEEN_MESSAGES = 100
+    """Amount of recent message IDs to remember for dropping duplicate deliveries."""
+
+    def __init__(self, bot, url: str = EVENTSUB_URL, api: str = None):
+        """Create a new `EventSubHandler`. Call `start()` to connect.
+
+        :param bot: The `TwitchBot` to deliver events to.
+        :param url: The EventSub WebSocket URL, e.g. a local mock server for testing.
+        :param api: Base URL to create subscriptions at, if not the Helix API (e.g. a local mock server).
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.bot = bot
+        self.url = url
+        self.api = api
+
+        self.session_id = None
+        self._ws = None
+        self._seen = deque(maxlen=self.SEEN_MESSAGES)
+        self._warned = set()
+        self._stopped = threading.Event()
+
+    def __del__(self):
+        self._stopped.set()
+
+        # unblock the connection if waiting on it
+        if self._ws:
+            self._ws.close()
+
+    def subscriptions(self) -> list:
+        """Return the `(type, version, condition)` of every subscription to make for a session.
+
+        Follows need the bot to be a moderator with the `moderator:read:followers` scope.
+        Channel point redemptions can only be subscribed to with the broadcaster's own token,
+        i.e. when the bot runs on the broadcaster's account, with the `channel:read:redemptions` scope.
+        Subscriptions the token can't make are left out.
+        """
+        channel_id = str(self.bot.channel_id)
+        user_id = str(self.bot.user_id)
+
+        subscriptions = [
+            ("stream.online", "1", {"broadcaster_user_id": channel_id}),
+            ("stream.offline", "1", {"broadcaster_user_id": channel_id}),
+        ]
+
+        if self.has_scope("moderator:read:followers", "channel.follow"):
+            subscriptions.append(
+                (
+                    "channel.follow",
+                    "2",
+                    {"broadcaster_user_id": channel_id, "moderator_user_id": user_id},
+                )
+            )
+
+        if channel_id == user_id and self.has_scope(
+            "channel:read:redemptions",
+            "channel.channel_points_custom_reward_redemption.add",
+        ):
+            subscriptions.append(
+                (
+                    "channel.channel_points_custom_reward_redemption.add",
+                    "1",
+                    {"broadcaster_user_id": channel_id},
+                )
+            )
+
+        return subscriptions
+
+    def has_scope(self, scope: str, type: str) -> bool:
+        """Return whether the token was granted `scope`, warning once that `type` events are unavailable if not."""
+        if not self.bot.auth.missing_scopes([scope]):
+            return True
+
+        if type not in self._warned:
+            self._warned.add(type)
+            logging.warning(
+                f"not receiving {type} events: the Twitch token lacks the '{scope}' scope. "
+                + f"Remove 'token' from {self.bot.auth.cfg_handler._path} and restart rasbot to re-authorize."
+            )
+        return False
+
+    def run(self):
+        """Keep a session open until `__del__` is called."""
+        wait = self.RECONNECT_MIN_WAIT
+
+        while not self._stopped.is_set():
+            try:
+                self._ws = self.connect(self.url)
+                wait = self.RECONNECT_MIN_WAIT
+
+                self.subscribe()
+                self.listen()
+
+            except (OSError, ValueError, KeyError, websocket.WebSocketException) as err:
+                if self._stopped.is_set():
+                    break
+                logging.warning(f"EventSub connection lost ({err}), retrying in {wait}s")
+
+            finally:
+                if self._ws:
+                    self._ws.close()
+                self.session_id = None
+
+            # events may be missed while disconnected, so fall back to polling
+            self.bot.stream_handler.set_push(False)
+
+            self._stopped.wait(wait)
+            wait = min(wait * 2, self.RECONNECT_MAX_WAIT)
+
+    def connect(self, url: str) -> websocket.WebSocket:
+        """Open a connection to `url` and wait for its welcome message.
+
+        :return: The connection, with its timeout set to the session's keepalive timeout.
+        """
+        ws = websocket.create_connection(url, timeout=self.CONNECT_TIMEOUT)
+
+        try:
+            message = json.loads(ws.recv())
+            if message["metadata"]["message_type"] != "session_welcome":
+                raise ValueError(f"expected session_welcome, got {message}")
+
+            session = message["payload"]["session"]
+            ws.settimeout(session["keepalive_timeout_seconds"] + self.KEEPALIVE_GRACE)
+
+        except BaseException:
+            ws.close()
+            raise
+
+        self.session_id = session["id"]
+        logging.info(f"EventSub session {self.session_id} started")
+        return ws
+
+    def subscribe(self):
+        """Subscribe the current session to `subscriptions()`."""
+        subscribed = set()
+        for type, version, condition in self.subscriptions():
+            if self.bot.auth.create_eventsub_subscription(
+                type, version, condition, self.session_id, self.api
+            ):
+                subscribed.add(type)
+
+        logging.info(f"subscribed to {len(subscribed)} EventSub event(s)")
+
+        # online/offline events keep stream state current, so polling can stop
+        if {"stream.online", "stream.offline"} <= subscribed:
+            self.bot.stream_handler.set_push(True)
+
+    def listen(self):
+        """Handle messages on the current session until the connection fails."""
+        while not self._stopped.is_set():
+            message = json.loads(self._ws.recv())
+            metadata = message["metadata"]
+
+            # Twitch may deliver a message more than once
+            if metadata["message_id"] in self._seen:
+                continue
+            self._seen.append(metadata["message_id"])
+
+            message_type = metadata["message_type"]
+            if message_type == "notification":
+                self.dispatch(
+                    metadata["subscription_type"], message["payload"]["event"]
+                )
+
+            elif message_type == "session_reconnect":
+                # subscriptions carry over; switch once the new session is welcomed
+                url = message["payload"]["session"]["reconnect_url"]
+                ws = self.connect(url)
+                self._ws.close()
+                self._ws = ws
+
+            elif message_type == "revocation":
+                logging.warning(
+                    f"EventSub subscription {metadata['subscription_type']} revoked: "
+                    + message["payload"]["subscription"]["status"]
+                )
+
+    def dispatch(self, type: str, event: dict):
+        """Deliver an event to the stream state tracker and modules.
+
+        :param type: The subscription type of the event, e.g. `stream.online`.
+        :param event: The event data.
+        """
+        logging.debug(f"EventSub {type}: {event}")
+
+        try:
+            if type == "stream.online":
+                self.bot.stream_handler.set_online(
+                    datetime.datetime.fromisoformat(
+                        event["started_at"].replace("Z", "+00:00")
+                    )
+                )
+
+            elif type == "stream.offline":
+                self.bot.stream_handler.set_offline()
+
+            self.bot.modules_handler.do_on_event(type, event)
+
+        except Exception:
+            logging.error(traceback.format_exc())
@@ -95,6 +95,18 @@ class BaseModule(threading.Thread):
         """
         pass
 
+    def on_event(self, type: str, event: dict):
+        """Code to be run for every EventSub event received,
+        e.g. `stream.online`, `stream.offline`, `channel.follow`,
+        or `channel.channel_points_custom_reward_redemption.add`.
+
+        By default, does nothing.
+
+        :param type: The subscription type of the event.
+        :param event: The event data, as sent by Twitch.
+        """
+        pass
+
     def log_e(self, msg: str):
         """Log an error alongside the module's name to the window.
 
@@ -207,3 +219,16 @@ class ModulesHandler:
         """
         for module in self.modules.values():
             module.on_pubmsg(message)
+
+    def do_on_event(self, type: str, event: dict):
+        """Runs the on_event() of every `Module` imported.
+
+        :param type: The subscription type of the event.
+        :param event: The event data.
+        """
+        for module in list(self.modules.values()):
+            try:
+                module.on_event(type, event)
+            except Exception:
+                logging.error(f"module {module._name} failed to handle event {type}:")
+                logging.error(traceback.format_exc())
@@ -0,0 +1,88 @@
+import logging
+import threading
+import traceback
+
+from src.definitions import RepeatTimer
+
+
+class PresenceHandler:
+    """Tracks who is in chat from IRC JOIN/PART/NAMES and message senders.
+
+    Twitch only sends membership events for smaller channels and batches them,
+    so the set is occasionally reconciled against the Helix chatters list.
+    """
+
+    RECONCILE_INTERVAL = 900
+    """Time between reconciliations with the Helix chatters list, in seconds."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.chatters = set()
+        self._lock = threading.Lock()
+
+        self._changes = None
+        """Changes seen while reconciling, as `user: present`, or `None` if not reconciling."""
+
+        self.timer = RepeatTimer(self.RECONCILE_INTERVAL, self.reconcile)
+        self.timer.start()
+
+    def __del__(self):
+        self.timer.cancel()
+
+    def snapshot(self) -> frozenset:
+        """Return the users currently in chat, by login name."""
+        with self._lock:
+            return frozenset(self.chatters)
+
+    def join(self, user: str):
+        """Mark `user` as present in chat."""
+        user = user.lower()
+        with self._lock:
+            self.chatters.add(user)
+            if self._changes is not None:
+                self._changes[user] = True
+
+    def part(self, user: str):
+        """Mark `user` as no longer in chat."""
+        user = user.lower()
+        with self._lock:
+            self.chatters.discard(user)
+            if self._changes is not None:
+                self._changes[user] = False
+
+    def reconcile_async(self):
+        """Reconcile in the background, e.g. after (re)joining chat, where the membership events
+        missed while disconnected and NAMES for large channels (moderators only) leave the set incomplete.
+        """
+        threading.Thread(target=self.reconcile, daemon=True).start()
+
+    def reconcile(self):
+        """Replace the tracked set with the Helix chatters list, keeping any changes seen while fetching it."""
+        with self._lock:
+            if self._changes is not None:
+                return
+            self._changes = dict()
+
+        try:
+            chatters = self.bot.auth.get_all_chatters(
+                self.bot.channel_id, self.bot.user_id
+            )
+            chatters = {user.lower() for user in chatters}
+
+        except Exception:
+            logging.error(f"failed to reconcile chatters:\n{traceback.format_exc()}")
+            with self._lock:
+                self._changes = None
+            return
+
+        with self._lock:
+            for user, present in self._changes.items():
+                if present:
+                    chatters.add(user)
+                else:
+                    chatters.discard(user)
+
+            self.chatters = chatters
+            self._changes = None
+
+        logging.debug(f"reconciled chatters with Helix: {len(chatters)} present")
@@ -0,0 +1,124 @@
+import datetime
+import logging
+import threading
+import traceback
+
+from src.definitions import RepeatTimer
+
+
+class StreamStateHandler:
+    """Shared tracker for whether the channel is live and since when.
+
+    Polls Helix on a schedule so modules can check stream state without each making their own request.
+    Push sources (e.g. online/offline events) can update it directly with `set_online` and `set_offline`.
+    """
+
+    live: bool
+    """Whether the channel is currently live."""
+    started_at: datetime.datetime | None
+    """When the current stream started (timezone-aware, UTC), or `None` if offline."""
+    push_active: bool
+    """Whether a push source is keeping the state current, pausing polling."""
+
+    POLL_INTERVAL = 60
+    """Time between checks of the stream state, in seconds."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.live = False
+        self.started_at = None
+        self.push_active = False
+        self.subscribers = []
+        self._lock = threading.Lock()
+
+        self.poll()
+
+        self.timer = RepeatTimer(self.POLL_INTERVAL, self.tick)
+        self.timer.start()
+
+    def __del__(self):
+        self.timer.cancel()
+
+    def subscribe(self, callback):
+        """Call `callback` whenever the channel goes live or offline.
+
+        :param callback: A function taking `True` when going live, or `False` when going offline.
+        """
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Stop calling `callback` on changes."""
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def set_push(self, active: bool):
+        """Pause polling while a push source (e.g. EventSub) delivers online/offline changes, or resume it.
+
+        Polls once either way, so no change is missed while switching over.
+
+        :param active: Whether the push source is delivering changes.
+        """
+        self.push_active = active
+        self.poll()
+
+    def tick(self):
+        """Poll the stream state, unless a push source is keeping it current."""
+        if not self.push_active:
+            self.poll()
+
+    def poll(self):
+        """Fetch the stream state from Helix. Keeps the last known state if the request fails."""
+        try:
+            stream = self.bot.auth.get_stream(self.bot.channel_id)
+        except Exception:
+            logging.error(f"failed to poll stream state:\n{traceback.format_exc()}")
+            return
+
+        if not stream:
+            self.set_offline()
+            return
+
+        self.set_online(
+            datetime.datetime.fromisoformat(stream["started_at"].replace("Z", "+00:00"))
+        )
+
+    def set_online(self, started_at: datetime.datetime):
+        """Mark the channel as live.
+
+        :param started_at: When the stream started.
+        """
+        with self._lock:
+            changed = not self.live
+            self.live = True
+            self.started_at = started_at
+
+        if changed:
+            logging.info(f"{self.bot.channel_name} is now live")
+            self.on_change(True)
+
+    def set_offline(self):
+        """Mark the channel as offline."""
+        with self._lock:
+            changed = self.live
+            self.live = False
+            self.started_at = None
+
+        if changed:
+            logging.info(f"{self.bot.channel_name} is now offline")
+            self.on_change(False)
+
+    def on_change(self, live: bool):
+        """Notify subscribers of the channel going live or offline."""
+        for callback in list(self.subscribers):
+            try:
+                callback(live)
+            except Exception:
+                logging.error(traceback.format_exc())
+
+    def uptime(self) -> datetime.timedelta | None:
+        """Return how long the channel has been live, or `None` if it is offline."""
+        started_at = self.started_at
+        if not started_at:
+            return None
+
+        return datetime.datetime.now(datetime.timezone.utc) - started_at